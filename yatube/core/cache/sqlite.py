@@ -0,0 +1,194 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине."""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+# раз в столько записей проверяем, не пора ли вытеснять старые ключи
+CULL_EVERY = 50
+
+
+def connect(path, schema):
+    """Открывает файл SQLite в режиме WAL и создаёт таблицы."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    for statement in schema:
+        connection.execute(statement)
+    return connection
+
+
+class SQLiteCache(BaseCache):
+    """Бэкенд кэша поверх файла SQLite в режиме WAL.
+
+    LOCATION — путь к файлу базы. Каждый поток держит своё соединение;
+    `None` в столбце expires означает ключ без срока жизни.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _db(self):
+        # после fork соединение родителя не годится: его нельзя делить
+        # между процессами
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = connect(self._path, SCHEMA)
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        # у BaseCache -1 означает «уже истёк»
+        return time.time() - 1 if expires == -1 else expires
+
+    @staticmethod
+    def _alive(expires):
+        return expires is None or expires > time.time()
+
+    def _maybe_cull(self):
+        self._writes += 1
+        if self._writes % CULL_EVERY:
+            return
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache'
+                ' ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(count // self._cull_frequency, 1),),
+            )
+
+    def get(self, key, default=None, version=None):
+        row = self._db.execute(
+            'SELECT value, expires FROM cache WHERE key = ?',
+            (self._key(key, version),),
+        ).fetchone()
+        if row is None or not self._alive(row[1]):
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        mapping = {self._key(key, version): key for key in keys}
+        if not mapping:
+            return {}
+        placeholders = ','.join('?' * len(mapping))
+        rows = self._db.execute(
+            f'SELECT key, value, expires FROM cache '
+            f'WHERE key IN ({placeholders})',
+            list(mapping),
+        )
+        return {
+            mapping[key]: pickle.loads(value)
+            for key, value, expires in rows if self._alive(expires)
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires)'
+            ' VALUES (?, ?, ?)',
+            (self._key(key, version), self._dumps(value),
+             self._expires(timeout)),
+        )
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        db = self._db
+        with db:
+            db.execute('BEGIN')
+            db.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires)'
+                ' VALUES (?, ?, ?)',
+                [(self._key(key, version), self._dumps(value), expires)
+                 for key, value in data.items()],
+            )
+        self._maybe_cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires)'
+                ' VALUES (?, ?, ?)',
+                (key, self._dumps(value), self._expires(timeout)),
+            ).rowcount
+        return added == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or not self._alive(row[1]):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (self._dumps(value), key),
+            )
+        return value
+
+    def has_key(self, key, version=None):
+        row = self._db.execute(
+            'SELECT expires FROM cache WHERE key = ?',
+            (self._key(key, version),),
+        ).fetchone()
+        return row is not None and self._alive(row[0])
+
+    def delete(self, key, version=None):
+        self._db.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def delete_many(self, keys, version=None):
+        db = self._db
+        with db:
+            db.execute('BEGIN')
+            db.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys],
+            )
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
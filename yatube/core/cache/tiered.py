@@ -0,0 +1,154 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим хранилищем."""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# память процесса общая для всех потоков, как у LocMemCache
+_stores = {}
+_locks = {}
+
+
+class TwoTierCache(BaseCache):
+    """Читает горячие ключи из памяти процесса, остальное — из общего кэша.
+
+    OPTIONS:
+        SHARED — алиас общего кэша из CACHES (по умолчанию LOCATION);
+        LOCAL_MAX_ENTRIES — размер LRU в памяти процесса;
+        LOCAL_TIMEOUT — сколько секунд держать ключ в памяти процесса;
+        LOCAL_KEY_PREFIXES — какие ключи держать в памяти процесса.
+
+    Удаление в другом процессе не видно в памяти этого процесса до
+    LOCAL_TIMEOUT, поэтому локально держатся только ключи, содержимое
+    которых не меняется: фрагменты шаблонов с поколением ленты в ключе.
+    Поколения, счётчики и прочие ключи всегда читаются из общего кэша.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', location)
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 300)
+        self._local_prefixes = tuple(
+            options.get('LOCAL_KEY_PREFIXES', ('template.cache.',))
+        )
+        self._local = _stores.setdefault(self._shared_alias, OrderedDict())
+        self._lock = _locks.setdefault(self._shared_alias, threading.Lock())
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _is_local(self, key):
+        return key.startswith(self._local_prefixes)
+
+    def _local_get(self, key, version):
+        local_key = self.make_key(key, version=version)
+        with self._lock:
+            item = self._local.get(local_key)
+            if item is None:
+                return None
+            expires, pickled = item
+            if expires <= time.time():
+                del self._local[local_key]
+                return None
+            self._local.move_to_end(local_key)
+        return pickle.loads(pickled)
+
+    def _local_set(self, key, value, timeout, version):
+        timeout = self.get_backend_timeout(timeout)
+        expires = time.time() + self._local_timeout
+        if timeout is not None:
+            expires = min(expires, timeout)
+        local_key = self.make_key(key, version=version)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._lock:
+            self._local[local_key] = (expires, pickled)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key, version):
+        with self._lock:
+            self._local.pop(self.make_key(key, version=version), None)
+
+    def get(self, key, default=None, version=None):
+        if self._is_local(key):
+            value = self._local_get(key, version)
+            if value is not None:
+                return value
+        value = self.shared.get(key, version=version)
+        if value is None:
+            return default
+        if self._is_local(key):
+            self._local_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = None
+            if self._is_local(key):
+                value = self._local_get(key, version)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key, value in shared.items():
+                if self._is_local(key):
+                    self._local_set(key, value, DEFAULT_TIMEOUT, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        if self._is_local(key):
+            self._local_set(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if self._is_local(key) and key not in (failed or ()):
+                self._local_set(key, value, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added and self._is_local(key):
+            self._local_set(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local_delete(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        if self._is_local(key) and self._local_get(key, version) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(key, version)
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._local_delete(key, version)
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
@@ -0,0 +1,103 @@
+"""Хранилище метаданных миниатюр sorl-thumbnail.
+
+Штатное cached_db хранилище на каждый промах кэша ходит в основную
+базу, а с LocMemCache его кэш у каждого воркера свой. Здесь записи
+лежат в отдельном файле SQLite, общем для процессов машины, а перед
+ним стоит LRU в памяти процесса: найденная миниатюра на следующих
+страницах отдаётся из словаря без обращения к диску.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+from .cache.sqlite import connect
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS thumbnails ('
+    ' key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID',
+)
+
+
+class SQLiteKVStore(KVStoreBase):
+    """KV-хранилище sorl-thumbnail в файле SQLite с LRU в памяти.
+
+    В LRU попадают только найденные значения: миниатюру, построенную
+    в другом процессе, этот процесс увидит при следующем обращении.
+    Удаление в другом процессе видно здесь не позже
+    THUMBNAIL_KVSTORE_LRU_TIMEOUT секунд.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._path = settings.THUMBNAIL_KVSTORE_PATH
+        self._max_entries = settings.THUMBNAIL_KVSTORE_LRU_SIZE
+        self._timeout = settings.THUMBNAIL_KVSTORE_LRU_TIMEOUT
+        self._local = threading.local()
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def _db(self):
+        # после fork (пул warm_thumbnails) соединение родителя не годится
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = connect(self._path, SCHEMA)
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = (value, time.monotonic() + self._timeout)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self._max_entries:
+                self._lru.popitem(last=False)
+
+    def _forget(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._lru.pop(key, None)
+
+    def _get(self, key, identity='image'):
+        # в LRU лежат уже разобранные ImageFile: разбор JSON и создание
+        # хранилища для каждой миниатюры дороже самого чтения из SQLite
+        raw_key = add_prefix(key, identity)
+        with self._lock:
+            entry = self._lru.get(raw_key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._lru.move_to_end(raw_key)
+                return entry[0]
+        value = super()._get(key, identity)
+        if value is not None:
+            self._remember(raw_key, value)
+        return value
+
+    def _get_raw(self, key):
+        row = self._db.execute(
+            'SELECT value FROM thumbnails WHERE key = ?', (key,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _set_raw(self, key, value):
+        self._db.execute(
+            'INSERT OR REPLACE INTO thumbnails (key, value) VALUES (?, ?)',
+            (key, value),
+        )
+        self._forget(key)
+
+    def _delete_raw(self, *keys):
+        db = self._db
+        with db:
+            db.execute('BEGIN')
+            db.executemany('DELETE FROM thumbnails WHERE key = ?',
+                           [(key,) for key in keys])
+        self._forget(*keys)
+
+    def _find_keys_raw(self, prefix):
+        rows = self._db.execute(
+            'SELECT key FROM thumbnails WHERE substr(key, 1, ?) = ?',
+            (len(prefix), prefix),
+        )
+        return [key for key, in rows]
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import slowlog
+
+SORT_KEYS = {
+    'total': lambda entry: entry['total'],
+    'count': lambda entry: entry['count'],
+    'max': lambda entry: entry['max'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Показывает накопленный журнал медленных SQL-запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort', choices=list(SORT_KEYS), default='total',
+            help='по чему сортировать отпечатки',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='сколько отпечатков показать',
+        )
+        parser.add_argument(
+            '--json', action='store_true', help='вывести JSON',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='очистить журнал после вывода',
+        )
+
+    def write_entry(self, entry):
+        views = ', '.join(
+            f'{view} ×{count}' for view, count in entry['views'].most_common()
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'[{entry["fingerprint"]}] {entry["count"]} раз, '
+            f'всего {entry["total"] * 1000:.1f} мс, '
+            f'максимум {entry["max"] * 1000:.1f} мс'
+        ))
+        self.stdout.write(f'  view: {views}')
+        self.stdout.write(f'  {entry["sql"]}')
+        for line in (entry['plan'] or '').splitlines():
+            self.stdout.write(f'    {line}')
+
+    def handle(self, *args, **options):
+        entries = sorted(slowlog.collect(), key=SORT_KEYS[options['sort']],
+                         reverse=True)[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(entries, ensure_ascii=False,
+                                         indent=2))
+        elif entries:
+            for entry in entries:
+                self.write_entry(entry)
+        else:
+            self.stdout.write('Медленных запросов не было')
+        if options['reset']:
+            slowlog.reset()
@@ -0,0 +1,219 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+MetricsMiddleware замеряет долю METRICS_SAMPLE_RATE запросов: время
+ответа, число SQL-запросов и их время, время рендера шаблонов и
+попадания в кэш. Замеры копятся в памяти процесса: суммы по view
+растут монотонно, а квантили считаются по кольцевому буферу из
+последних METRICS_BUFFER_SIZE замеров. Каждый воркер отдаёт на
+/metrics свои числа, поэтому Prometheus должен опрашивать их по
+отдельности или суммировать по меткам instance.
+"""
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# поля замера, которые суммируются по view
+FIELDS = ('duration', 'queries', 'sql_time', 'render_time',
+          'cache_hits', 'cache_misses')
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current = threading.local()
+_lock = threading.Lock()
+_totals = defaultdict(lambda: dict.fromkeys(('requests',) + FIELDS, 0))
+_buffer = None
+
+
+class Sample:
+    """Замер одного запроса."""
+
+    __slots__ = ('view',) + FIELDS
+
+    def __init__(self):
+        self.view = None
+        for field in FIELDS:
+            setattr(self, field, 0)
+
+
+def should_sample():
+    return random.random() < settings.METRICS_SAMPLE_RATE
+
+
+def current():
+    """Замер текущего запроса или None, если запрос не замеряется."""
+    return getattr(_current, 'sample', None)
+
+
+def _count_query(execute, sql, params, many, context):
+    sample = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.sql_time += time.perf_counter() - started
+
+
+@contextmanager
+def _count_cache(sample):
+    """Считает попадания в кэш default, пока идёт запрос.
+
+    Экземпляр бэкенда кэша у каждого потока свой, поэтому методы
+    подменяются только у экземпляра текущего потока. Вложенные кэши
+    (shared у TwoTierCache) не считаются, чтобы не считать ключ дважды.
+    """
+    backend = caches['default']
+    get, get_many = backend.get, backend.get_many
+
+    def counted_get(key, default=None, version=None):
+        value = get(key, default, version=version)
+        if value is default:
+            sample.cache_misses += 1
+        else:
+            sample.cache_hits += 1
+        return value
+
+    def counted_get_many(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        sample.cache_hits += len(found)
+        sample.cache_misses += len(keys) - len(found)
+        return found
+
+    backend.get, backend.get_many = counted_get, counted_get_many
+    try:
+        yield
+    finally:
+        del backend.get, backend.get_many
+
+
+@contextmanager
+def recording(sample):
+    """Собирает в sample всё, что происходит в этом потоке."""
+    _current.sample = sample
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(_count_query), _count_cache(sample):
+            yield sample
+    finally:
+        sample.duration = time.perf_counter() - started
+        _current.sample = None
+
+
+def record(sample):
+    global _buffer
+    with _lock:
+        if _buffer is None:
+            _buffer = deque(maxlen=settings.METRICS_BUFFER_SIZE)
+        _buffer.append(sample)
+        totals = _totals[sample.view]
+        totals['requests'] += 1
+        for field in FIELDS:
+            totals[field] += getattr(sample, field)
+
+
+def reset():
+    global _buffer
+    with _lock:
+        _buffer = None
+        _totals.clear()
+
+
+def _quantile(values, quantile):
+    values = sorted(values)
+    return values[min(int(quantile * len(values)), len(values) - 1)]
+
+
+def _label(value):
+    value = str(value).replace('\\', r'\\').replace('"', r'\"')
+    return value.replace('\n', r'\n')
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus 0.0.4."""
+    with _lock:
+        totals = {view: dict(values) for view, values in _totals.items()}
+        samples = list(_buffer or ())
+    lines = [
+        '# HELP yatube_metrics_sample_rate Доля замеряемых запросов.',
+        '# TYPE yatube_metrics_sample_rate gauge',
+        f'yatube_metrics_sample_rate {settings.METRICS_SAMPLE_RATE}',
+    ]
+    counters = (
+        ('requests', 'yatube_requests_total', 'Замеренные запросы.'),
+        ('sql_time', 'yatube_sql_seconds_total', 'Время SQL-запросов.'),
+        ('render_time', 'yatube_render_seconds_total',
+         'Время рендера шаблонов.'),
+        ('cache_hits', 'yatube_cache_hits_total', 'Попадания в кэш.'),
+        ('cache_misses', 'yatube_cache_misses_total', 'Промахи кэша.'),
+    )
+    for field, name, help_text in counters:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        lines += [
+            f'{name}{{view="{_label(view)}"}} {values[field]}'
+            for view, values in sorted(totals.items())
+        ]
+    by_view = defaultdict(list)
+    for sample in samples:
+        by_view[sample.view].append(sample)
+    summaries = (
+        ('duration', 'yatube_request_duration_seconds',
+         'Время ответа; квантили по последним замерам.'),
+        ('queries', 'yatube_request_queries',
+         'SQL-запросов на ответ; квантили по последним замерам.'),
+    )
+    for field, name, help_text in summaries:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} summary']
+        for view, values in sorted(totals.items()):
+            label = _label(view)
+            window = [getattr(sample, field) for sample in by_view[view]]
+            if window:
+                lines += [
+                    f'{name}{{view="{label}",quantile="{quantile}"}} '
+                    f'{_quantile(window, quantile)}'
+                    for quantile in QUANTILES
+                ]
+            lines += [
+                f'{name}_sum{{view="{label}"}} {values[field]}',
+                f'{name}_count{{view="{label}"}} {values["requests"]}',
+            ]
+    return '\n'.join(lines) + '\n'
+
+
+class MeasuredTemplate(Template):
+    """Шаблон, время рендера которого попадает в замер запроса."""
+
+    def render(self, context=None, request=None):
+        sample = current()
+        if sample is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.render_time += time.perf_counter() - started
+
+
+class MeasuredDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, который замеряет время рендера.
+
+    Вложенные {% include %} и inclusion-теги рендерятся внутри шаблона
+    верхнего уровня и отдельно не считаются.
+    """
+
+    def from_string(self, template_code):
+        return MeasuredTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return MeasuredTemplate(
+                self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,35 @@
+from . import metrics, slowlog
+
+
+class MetricsMiddleware:
+    """Замеряет часть запросов для /metrics (см. core.metrics).
+
+    Стоит первым в MIDDLEWARE, чтобы в замер попали запросы к сессиям
+    и пользователю, которые делают остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics.should_sample():
+            return self.get_response(request)
+        with metrics.recording(metrics.Sample()) as sample:
+            response = self.get_response(request)
+        match = request.resolver_match
+        sample.view = match.view_name if match is not None else 'unresolved'
+        metrics.record(sample)
+        return response
+
+
+class SlowQueryMiddleware:
+    """Пишет медленные SQL-запросы в журнал (см. core.slowlog)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with slowlog.watching(request):
+            response = self.get_response(request)
+        slowlog.flush()
+        return response
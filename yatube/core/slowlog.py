@@ -0,0 +1,230 @@
+"""Журнал медленных SQL-запросов.
+
+SlowQueryMiddleware оборачивает каждый запрос к сайту в
+connection.execute_wrapper: SQL дольше SLOW_QUERY_THRESHOLD_MS пишется
+в лог `core.slowlog` вместе с view, из которого он пришёл, отпечатком
+(текстом без литералов и списков параметров) и планом EXPLAIN.
+Отпечатки копятся в памяти процесса и после ответа сохраняются в кэш
+под ключом процесса, откуда их собирает `manage.py slow_queries`.
+С общим кэшем (sqlite, tiered, file) видны запросы всех воркеров.
+Список ключей процессов меняется под блокировкой на cache.add, чтобы
+воркеры не затирали записи друг друга. Сброс записывает в кэш своё
+время: увидев сброс новее последнего учтённого, воркер забывает свои
+отпечатки и не возвращает их в кэш.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger(__name__)
+
+PROCESSES_KEY = 'slow_queries:processes'
+REGISTRY_LOCK_KEY = 'slow_queries:processes:lock'
+RESET_KEY = 'slow_queries:reset'
+# блокировка списка процессов: столько попыток, пауза и время жизни
+REGISTRY_ATTEMPTS = 20
+REGISTRY_RETRY_DELAY = 0.05
+REGISTRY_LOCK_TIMEOUT = 5
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+_local = threading.local()
+_lock = threading.Lock()
+_entries = {}
+_dirty = False
+# время последнего учтённого сброса; более ранние сбросы процесса не касаются
+_reset_at = time.time()
+
+
+def normalize(sql):
+    """SQL без литералов: одинаковые запросы с разными данными совпадают."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PARAMS.sub('(...)', sql.replace('%s', '?'))
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    normalized = normalize(sql)
+    digest = hashlib.md5(normalized.encode()).hexdigest()[:12]
+    return digest, normalized
+
+
+def _view_name():
+    request = getattr(_local, 'request', None)
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+def explain(db, sql, params):
+    """План запроса в одну строку на узел или None, если его не получить."""
+    if sql.lstrip()[:6].upper() != 'SELECT':
+        return None
+    _local.explaining = True
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(
+                f'{db.ops.explain_query_prefix()} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    finally:
+        _local.explaining = False
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+def _sync_reset():
+    """Забывает отпечатки процесса, если журнал сбросили в другом."""
+    global _dirty, _reset_at
+    reset_at = cache.get(RESET_KEY)
+    if reset_at is None:
+        return
+    with _lock:
+        if reset_at > _reset_at:
+            _entries.clear()
+            _dirty = False
+            _reset_at = reset_at
+
+
+def record(sql, params, many, duration, db):
+    global _dirty
+    _sync_reset()
+    digest, normalized = fingerprint(sql)
+    view = _view_name()
+    with _lock:
+        entry = _entries.get(digest)
+    plan = None
+    if (entry is None or entry['plan'] is None) and not many:
+        plan = explain(db, sql, params)
+    with _lock:
+        entry = _entries.get(digest)
+        if entry is None:
+            if len(_entries) >= settings.SLOW_QUERY_MAX_ENTRIES:
+                # вытесняем отпечаток, который стоил меньше всего времени
+                del _entries[min(_entries,
+                                 key=lambda key: _entries[key]['total'])]
+            entry = _entries[digest] = {
+                'sql': normalized, 'count': 0, 'total': 0.0, 'max': 0.0,
+                'views': Counter(), 'plan': None,
+            }
+        entry['count'] += 1
+        entry['total'] += duration
+        entry['max'] = max(entry['max'], duration)
+        entry['views'][view] += 1
+        entry['plan'] = entry['plan'] or plan
+        _dirty = True
+    logger.warning(
+        'Медленный запрос %.1f мс во view %s [%s]: %s%s',
+        duration * 1000, view, digest, normalized,
+        f'\n{plan}' if plan else '',
+    )
+
+
+def _wrapper(execute, sql, params, many, context):
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        record(sql, params, many, duration, context['connection'])
+    return result
+
+
+@contextmanager
+def watching(request=None):
+    """Медленные запросы внутри блока попадают в журнал с view из request."""
+    _local.request = request
+    try:
+        with connection.execute_wrapper(_wrapper):
+            yield
+    finally:
+        _local.request = None
+
+
+def _process_key():
+    return f'slow_queries:{os.getpid()}'
+
+
+def flush():
+    """Сохраняет отпечатки процесса в кэш, если они изменились."""
+    global _dirty
+    _sync_reset()
+    with _lock:
+        if not _dirty:
+            return
+        snapshot = {digest: dict(entry, views=dict(entry['views']))
+                    for digest, entry in _entries.items()}
+        _dirty = False
+    key = _process_key()
+    cache.set(key, snapshot, settings.SLOW_QUERY_TIMEOUT)
+    if key not in cache.get(PROCESSES_KEY, []):
+        _register(key)
+
+
+def _register(key):
+    """Добавляет ключ процесса в общий список и убирает истёкшие.
+
+    Если блокировку так и не удалось взять, процесс попробует снова
+    при следующем flush.
+    """
+    for _ in range(REGISTRY_ATTEMPTS):
+        if cache.add(REGISTRY_LOCK_KEY, key, REGISTRY_LOCK_TIMEOUT):
+            break
+        time.sleep(REGISTRY_RETRY_DELAY)
+    else:
+        logger.warning('Не удалось записать %s в список процессов', key)
+        return
+    try:
+        processes = cache.get(PROCESSES_KEY, [])
+        # процессы, чьи снимки истекли, давно не работают
+        alive = cache.get_many(processes)
+        processes = [name for name in processes if name in alive]
+        if key not in processes:
+            processes.append(key)
+        cache.set(PROCESSES_KEY, processes, settings.SLOW_QUERY_TIMEOUT)
+    finally:
+        cache.delete(REGISTRY_LOCK_KEY)
+
+
+def collect():
+    """Отпечатки всех процессов, сложенные вместе."""
+    flush()
+    merged = {}
+    processes = cache.get(PROCESSES_KEY, [])
+    for snapshot in cache.get_many(processes).values():
+        for digest, entry in snapshot.items():
+            total = merged.setdefault(digest, {
+                'fingerprint': digest, 'sql': entry['sql'], 'count': 0,
+                'total': 0.0, 'max': 0.0, 'views': Counter(), 'plan': None,
+            })
+            total['count'] += entry['count']
+            total['total'] += entry['total']
+            total['max'] = max(total['max'], entry['max'])
+            total['views'].update(entry['views'])
+            total['plan'] = total['plan'] or entry['plan']
+    return list(merged.values())
+
+
+def reset():
+    """Очищает журнал во всех процессах, а не только в текущем."""
+    global _dirty, _reset_at
+    reset_at = time.time()
+    cache.set(RESET_KEY, reset_at, settings.SLOW_QUERY_TIMEOUT)
+    with _lock:
+        _entries.clear()
+        _dirty = False
+        _reset_at = reset_at
+    cache.delete_many(cache.get(PROCESSES_KEY, []) + [PROCESSES_KEY])
@@ -0,0 +1,79 @@
+"""Хранилище файлов в памяти процесса для тестов.
+
+В Django 2.2 своего InMemoryStorage ещё нет. Все экземпляры делят один
+словарь, поэтому картинка, сохранённая через default_storage, видна и
+хранилищу sorl-thumbnail. После fork у каждого процесса --parallel
+словарь свой.
+"""
+import posixpath
+import threading
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from django.utils.encoding import filepath_to_uri
+
+_files = {}
+_lock = threading.Lock()
+
+
+@deconstructible
+class InMemoryStorage(Storage):
+    def _open(self, name, mode='rb'):
+        try:
+            content, _ = _files[name]
+        except KeyError:
+            raise FileNotFoundError(name)
+        return ContentFile(content, name=name)
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        data = b''.join(
+            chunk.encode() if isinstance(chunk, str) else chunk
+            for chunk in content.chunks()
+        )
+        with _lock:
+            _files[name] = (data, timezone.now())
+        return name
+
+    def delete(self, name):
+        with _lock:
+            _files.pop(name, None)
+
+    def exists(self, name):
+        return name in _files
+
+    def listdir(self, path):
+        prefix = path.rstrip('/') + '/' if path else ''
+        directories, files = set(), []
+        for name in list(_files):
+            if not name.startswith(prefix):
+                continue
+            head, _, tail = name[len(prefix):].partition('/')
+            if tail:
+                directories.add(head)
+            else:
+                files.append(head)
+        return sorted(directories), sorted(files)
+
+    def size(self, name):
+        try:
+            return len(_files[name][0])
+        except KeyError:
+            raise FileNotFoundError(name)
+
+    def url(self, name):
+        return urljoin(settings.MEDIA_URL,
+                       filepath_to_uri(posixpath.normpath(name)))
+
+    def get_modified_time(self, name):
+        try:
+            return _files[name][1]
+        except KeyError:
+            raise FileNotFoundError(name)
+
+    get_created_time = get_accessed_time = get_modified_time
@@ -0,0 +1,18 @@
+from django import template
+
+register = template.Library()
+
+# сколько номеров страниц показывать по обе стороны от текущей
+PAGE_WINDOW = 2
+
+
+@register.filter
+def page_window(page_obj):
+    """Номера страниц вокруг текущей вместо всего page_range.
+
+    На больших лентах страниц тысячи, и цикл по всем номерам делал
+    отрисовку пагинатора дороже самой страницы.
+    """
+    first = max(page_obj.number - PAGE_WINDOW, 1)
+    last = min(page_obj.number + PAGE_WINDOW, page_obj.paginator.num_pages)
+    return range(first, last + 1)
@@ -0,0 +1,123 @@
+"""Помощники для тестов."""
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.functional import empty
+from sorl.thumbnail import default
+
+from . import metrics
+
+
+class BudgetMixin:
+    """Проверка бюджета SQL-запросов и времени рендера для TestCase.
+
+    Запросы и время рендера шаблонов считает core.metrics, как на
+    /metrics, поэтому в бюджет входят и middleware, и вложенные шаблоны.
+    """
+
+    @contextmanager
+    def assertBudget(self, queries, render_ms=None):
+        """Падает, если блок сделал больше queries SQL-запросов или
+        рендер шаблонов занял больше render_ms миллисекунд.
+
+        Возвращает замер (metrics.Sample), чтобы сравнить число
+        запросов на разных объёмах данных.
+        """
+        sample = metrics.Sample()
+        # выборочный замер middleware подменил бы наш замер своим
+        with self.settings(METRICS_SAMPLE_RATE=0), \
+                CaptureQueriesContext(connection) as captured, \
+                metrics.recording(sample):
+            yield sample
+        executed = [query['sql'] for query in captured.captured_queries]
+        if sample.queries > queries:
+            self.fail('Запросов {} при бюджете {}:\n{}'.format(
+                sample.queries, queries,
+                '\n'.join(f'{number}. {sql}'
+                          for number, sql in enumerate(executed, 1)),
+            ))
+        render_time = sample.render_time * 1000
+        if render_ms is not None and render_time > render_ms:
+            self.fail(f'Рендер шаблонов {render_time:.1f} мс при бюджете '
+                      f'{render_ms} мс')
+
+
+# GIF 2x1 для постов с картинкой
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def small_gif(name='small.gif'):
+    """Новая загрузка на каждый вызов: файл читается до конца при
+    сохранении, а setUpTestData в Django 2.2 не копирует атрибуты."""
+    return SimpleUploadedFile(name=name, content=SMALL_GIF,
+                              content_type='image/gif')
+
+
+class TemporaryMediaMixin:
+    """Свой MEDIA_ROOT и хранилище sorl-thumbnail на каждый класс тестов.
+
+    Не полагается на yatube.settings_test: и с yatube.settings картинки
+    и миниатюры не попадают в media/ и cache/ проекта. Миксин ставится
+    перед TestCase, чтобы данные класса сохранялись уже во временный
+    каталог.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_dir = tempfile.mkdtemp(prefix='yatube-media-')
+        cls._media_settings = override_settings(
+            MEDIA_ROOT=os.path.join(cls._media_dir, 'media'),
+            THUMBNAIL_KVSTORE_PATH=os.path.join(cls._media_dir,
+                                                'thumbnails.sqlite3'),
+        )
+        cls._media_settings.enable()
+        # хранилище ключей читает путь при создании, пересоздаём его
+        default.kvstore._wrapped = empty
+        try:
+            super().setUpClass()
+        except Exception:
+            cls._remove_media()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._remove_media()
+
+    @classmethod
+    def _remove_media(cls):
+        cls._media_settings.disable()
+        default.kvstore._wrapped = empty
+        shutil.rmtree(cls._media_dir, ignore_errors=True)
+
+
+@contextmanager
+def cache_writes():
+    """Ключи всех записей в кэш внутри блока, по одному на ключ."""
+    writes = []
+    with ExitStack() as stack:
+        for name in ('add', 'set', 'set_many', 'incr', 'delete',
+                     'delete_many', 'touch'):
+            original = getattr(cache, name)
+
+            def record(keys, *args, _original=original, **kwargs):
+                writes.extend([keys] if isinstance(keys, str) else keys)
+                return _original(keys, *args, **kwargs)
+
+            stack.enter_context(mock.patch.object(cache, name, record))
+        yield writes
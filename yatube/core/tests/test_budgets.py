@@ -0,0 +1,125 @@
+from importlib import import_module
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+from ..testing import BudgetMixin
+
+User = get_user_model()
+
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+
+# маршрут: (метод, аргументы адреса, кто заходит, запросов не больше)
+# «reader» подписан на всех авторов, «author» пишет посты
+ROUTES = {
+    'posts:index': ('get', lambda case: (), None, 3),
+    'posts:profile': (
+        'get', lambda case: (case.author.username,), None, 5),
+    'posts:search': ('get', lambda case: (), None, 4),
+    'posts:group_posts': ('get', lambda case: (case.group.slug,), None, 5),
+    'posts:post_detail': ('get', lambda case: (case.post.id,), None, 6),
+    'posts:post_create': ('get', lambda case: (), 'author', 3),
+    'posts:post_edit': ('get', lambda case: (case.post.id,), 'author', 4),
+    'posts:add_comment': ('post', lambda case: (case.post.id,), 'reader', 6),
+    'posts:post_comments': ('get', lambda case: (case.post.id,), None, 5),
+    # с пустым кэшем ещё и список авторов, на которых подписан читатель
+    'posts:follow_index': ('get', lambda case: (), 'reader', 5),
+    'posts:profile_follow': (
+        'get', lambda case: (case.other.username,), 'reader', 9),
+    'posts:profile_unfollow': (
+        'get', lambda case: (case.other.username,), 'reader', 7),
+    'users:logout': ('get', lambda case: (), 'reader', 4),
+    'users:signup': ('get', lambda case: (), None, 0),
+    'users:login': ('get', lambda case: (), None, 0),
+    'users:reset_password': ('get', lambda case: (), None, 0),
+    'users:password_reset_done': ('get', lambda case: (), None, 0),
+    'users:password_change': ('get', lambda case: (), 'reader', 2),
+    'about:author': ('get', lambda case: (), None, 0),
+    'about:tech': ('get', lambda case: (), None, 0),
+}
+RENDER_MS = 250
+
+
+def route_names(module):
+    urlconf = import_module(module)
+    return {f'{urlconf.app_name}:{pattern.name}'
+            for pattern in urlconf.urlpatterns if pattern.name}
+
+
+class QueryBudgetTest(BudgetMixin, TestCase):
+    """Бюджеты запросов для всех именованных маршрутов.
+
+    Каждый маршрут открывается с пустым кэшем при разных размерах
+    страницы и объёмах данных. Число запросов не должно расти вместе
+    с числом строк на странице: лишний запрос на строку (N+1) в
+    шаблоне проваливает тест, даже если в бюджет он ещё помещается.
+    """
+
+    PAGE_SIZES = (5, 20)
+    VOLUMES = (2, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='budget_author')
+        cls.reader = User.objects.create(username='budget_reader')
+        cls.other = User.objects.create(username='budget_other')
+        cls.group = Group.objects.create(title='Бюджет', slug='budget')
+        cls.post = Post.objects.create(text='бюджет пост', author=cls.author,
+                                       group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def add_rows(self, start, stop):
+        """Посты и комментарии от разных авторов, чтобы N+1 было видно."""
+        for number in range(start, stop):
+            writer = User.objects.create(username=f'budget_{number}',
+                                         first_name='Имя')
+            Follow.objects.create(user=self.reader, author=writer)
+            Post.objects.create(text=f'бюджет {number}', author=writer,
+                                group=self.group)
+            Post.objects.create(text=f'бюджет автора {number}',
+                                author=self.author, group=self.group)
+            Comment.objects.create(post=self.post, author=writer,
+                                   text=f'Комментарий {number}')
+
+    def request(self, name):
+        method, args, user, queries = ROUTES[name]
+        client = Client()
+        if user is not None:
+            client.force_login(getattr(self, user))
+        url = reverse(name, args=args(self))
+        data = {'text': 'Новый комментарий'} if method == 'post' else {}
+        if name == 'posts:search':
+            data = {'q': 'бюджет'}
+        cache.clear()
+        with self.assertBudget(queries, RENDER_MS) as sample:
+            response = getattr(client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        return sample.queries
+
+    def test_every_route_has_budget(self):
+        names = set()
+        for module in URLCONFS:
+            names |= route_names(module)
+        self.assertEqual(set(ROUTES), names)
+
+    def test_queries_do_not_grow_with_rows(self):
+        counts = {}
+        added = 0
+        for volume in self.VOLUMES:
+            self.add_rows(added, volume)
+            added = volume
+            for page_size in self.PAGE_SIZES:
+                with self.settings(COUNT_PAGES=page_size,
+                                   COMMENTS_PER_PAGE=page_size):
+                    for name in ROUTES:
+                        with self.subTest(route=name, page_size=page_size,
+                                          volume=volume):
+                            counts.setdefault((name, page_size), set()).add(
+                                self.request(name))
+        for (name, page_size), seen in counts.items():
+            with self.subTest(route=name, page_size=page_size):
+                self.assertLessEqual(len(seen), 1, seen)
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ..cache.sqlite import SQLiteCache
+
+CACHE_DIR = tempfile.mkdtemp()
+CACHE_PATH = os.path.join(CACHE_DIR, 'cache.sqlite3')
+TIERED_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.tiered.TwoTierCache',
+        'OPTIONS': {'SHARED': 'shared', 'LOCAL_TIMEOUT': 60},
+    },
+    'shared': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': CACHE_PATH,
+    },
+}
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # два экземпляра на одном файле — как два воркера gunicorn
+        self.cache = SQLiteCache(CACHE_PATH, {})
+        self.other = SQLiteCache(CACHE_PATH, {})
+        self.cache.clear()
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.other.get('key'), {'value': 1})
+        self.other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expiration_and_add(self):
+        self.cache.set('expired', 1, timeout=0)
+        self.assertIsNone(self.cache.get('expired'))
+        self.assertTrue(self.cache.add('expired', 2))
+        self.assertFalse(self.other.add('expired', 3))
+        self.assertEqual(self.cache.get('expired'), 2)
+
+    def test_incr_and_many(self):
+        self.cache.set_many({'a': 1, 'b': 2}, timeout=None)
+        self.assertEqual(self.other.incr('a', 10), 11)
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 11, 'b': 2})
+        with self.assertRaises(ValueError):
+            self.cache.incr('c')
+        self.cache.delete_many(['a', 'b'])
+        self.assertFalse(self.cache.has_key('a'))
+
+    def test_reconnects_after_fork(self):
+        """В дочернем процессе открывается своё соединение."""
+        self.cache.set('key', 1)
+        parent = self.cache._db
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(self.cache._db, parent)
+            self.assertEqual(self.cache.get('key'), 1)
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+
+    def test_fragments_served_from_process_memory(self):
+        """Фрагменты читаются из памяти, поколения — из общего кэша."""
+        self.cache.set('template.cache.feed.abc', '<p>лента</p>')
+        self.cache.set('feed_version:index', 1)
+        # другой воркер удаляет ключи напрямую из общего хранилища
+        caches['shared'].clear()
+        self.assertEqual(self.cache.get('template.cache.feed.abc'),
+                         '<p>лента</p>')
+        self.assertIsNone(self.cache.get('feed_version:index'))
+
+    def test_incr_goes_to_shared_store(self):
+        self.cache.set('feed_version:index', 1)
+        self.assertEqual(caches['shared'].incr('feed_version:index'), 2)
+        self.assertEqual(self.cache.get('feed_version:index'), 2)
@@ -0,0 +1,52 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from ..kvstore import SQLiteKVStore
+
+KVSTORE_DIR = tempfile.mkdtemp()
+KVSTORE_PATH = os.path.join(KVSTORE_DIR, 'thumbnails.sqlite3')
+
+
+@override_settings(THUMBNAIL_KVSTORE_PATH=KVSTORE_PATH,
+                   THUMBNAIL_KVSTORE_LRU_SIZE=2)
+class SQLiteKVStoreTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(KVSTORE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.store = SQLiteKVStore()
+        self.other = SQLiteKVStore()
+        self.store._delete_raw(*self.store._find_keys_raw(''))
+
+    def test_shared_between_processes(self):
+        """Запись одного воркера видна другому, промахи не кэшируются."""
+        self.assertIsNone(self.other._get_raw('sorl||image||a'))
+        self.store._set_raw('sorl||image||a', '{"size": [1, 1]}')
+        self.assertEqual(self.other._get_raw('sorl||image||a'),
+                         '{"size": [1, 1]}')
+        self.assertEqual(self.store._find_keys_raw('sorl||image'),
+                         ['sorl||image||a'])
+        self.store._delete_raw('sorl||image||a')
+        self.assertIsNone(self.store._get_raw('sorl||image||a'))
+
+    def test_lru_front(self):
+        """Горячие ключи читаются из памяти, LRU ограничен по размеру."""
+        for key in 'abc':
+            self.store._set(key, [key], identity='thumbnails')
+            self.assertEqual(self.store._get(key, identity='thumbnails'),
+                             [key])
+        self.assertEqual(list(self.store._lru),
+                         ['sorl-thumbnail||thumbnails||b',
+                          'sorl-thumbnail||thumbnails||c'])
+        with sqlite3.connect(KVSTORE_PATH) as connection:
+            connection.execute('DELETE FROM thumbnails')
+        self.assertEqual(self.store._get('c', identity='thumbnails'), ['c'])
+        self.assertIsNone(self.store._get('a', identity='thumbnails'))
+        self.store._set('c', ['d'], identity='thumbnails')
+        self.assertEqual(self.store._get('c', identity='thumbnails'), ['d'])
@@ -0,0 +1,99 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+def value(text, name, view):
+    match = re.search(
+        rf'^{name}{{view="{re.escape(view)}"}} (\S+)$', text, re.MULTILINE)
+    return None if match is None else float(match.group(1))
+
+
+@override_settings(METRICS_SAMPLE_RATE=1)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='metered')
+        Post.objects.create(text='Замеряемый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_request_is_measured(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        executed = len(queries)
+        self.client.get(reverse('posts:index'))
+        text = metrics.render()
+        self.assertEqual(value(text, 'yatube_requests_total', 'posts:index'),
+                         2)
+        self.assertEqual(
+            value(text, 'yatube_request_queries_sum', 'posts:index'),
+            executed,
+        )
+        self.assertGreater(
+            value(text, 'yatube_render_seconds_total', 'posts:index'), 0)
+        # вторую страницу отдаёт кэш для анонимных посетителей
+        self.assertGreater(
+            value(text, 'yatube_cache_hits_total', 'posts:index'), 0)
+        self.assertGreater(
+            value(text, 'yatube_cache_misses_total', 'posts:index'), 0)
+        self.assertIn('yatube_request_duration_seconds{view="posts:index",'
+                      'quantile="0.99"}', text)
+        self.assertEqual(cache.get('missing', 'default'), 'default')
+
+    def test_sampling(self):
+        with self.settings(METRICS_SAMPLE_RATE=0):
+            self.client.get(reverse('posts:index'))
+        self.assertIsNone(
+            value(metrics.render(), 'yatube_requests_total', 'posts:index'))
+
+    def test_ring_buffer(self):
+        with self.settings(METRICS_BUFFER_SIZE=2):
+            metrics.reset()
+            for duration in (10, 1, 2):
+                sample = metrics.Sample()
+                sample.view = 'test'
+                sample.duration = duration
+                metrics.record(sample)
+        text = metrics.render()
+        self.assertIn(
+            'yatube_request_duration_seconds{view="test",quantile="0.99"} 2',
+            text)
+        self.assertEqual(
+            value(text, 'yatube_request_duration_seconds_sum', 'test'), 13)
+
+    def test_endpoint(self):
+        with self.settings(METRICS_ALLOWED_IPS=['10.0.0.5']):
+            response = self.client.get(reverse('metrics'),
+                                       REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        # INTERNAL_IPS доступа не дают: за прокси это адрес любого клиента
+        self.assertIn('127.0.0.1', settings.INTERNAL_IPS)
+        self.assertEqual(settings.METRICS_ALLOWED_IPS, [])
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code, 404)
+        staff = User.objects.create_user(username='ops', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_debug_toolbar_only_in_debug(self):
+        self.assertFalse(settings.DEBUG)
+        self.assertNotIn('debug_toolbar.middleware.DebugToolbarMiddleware',
+                         settings.MIDDLEWARE)
@@ -0,0 +1,117 @@
+import json
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import slowlog
+
+User = get_user_model()
+
+
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='slow')
+        Post.objects.create(text='Медленный пост', author=cls.author)
+        cls.url = reverse('posts:profile', args=(cls.author.username,))
+
+    def setUp(self):
+        cache.clear()
+        slowlog.reset()
+
+    def test_normalize(self):
+        self.assertEqual(
+            slowlog.normalize(
+                "SELECT * FROM t WHERE a = 'it''s' AND b IN (%s, %s, %s)\n"
+                "  AND c > 10 LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c > ? LIMIT ?',
+        )
+        self.assertEqual(
+            slowlog.fingerprint('SELECT "t1"."id" FROM t1 WHERE id = 1'),
+            slowlog.fingerprint('SELECT "t1"."id" FROM  t1 WHERE id = 2'),
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_are_logged(self):
+        with self.assertLogs('core.slowlog', 'WARNING') as logs:
+            self.client.get(self.url)
+            cache.clear()
+            self.client.get(self.url)
+        self.assertIn('posts:profile', logs.output[0])
+        entries = slowlog.collect()
+        self.assertTrue(entries)
+        for entry in entries:
+            self.assertEqual(set(entry['views']), {'posts:profile'})
+            self.assertFalse(entry['sql'].startswith('EXPLAIN'))
+            if entry['sql'].startswith('SELECT'):
+                self.assertTrue(entry['plan'])
+        self.assertIn(2, [entry['count'] for entry in entries])
+
+    def test_fast_queries_are_skipped(self):
+        self.client.get(self.url)
+        self.assertEqual(slowlog.collect(), [])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_MAX_ENTRIES=2)
+    def test_entries_are_bounded(self):
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(self.url)
+        self.assertEqual(len(slowlog.collect()), 2)
+
+    def test_process_registry(self):
+        """Воркеры не затирают записи друг друга, истёкшие выпадают."""
+        cache.set(slowlog.PROCESSES_KEY, ['slow_queries:1', 'slow_queries:2'])
+        keys = [f'slow_queries:{pid}' for pid in range(1, 12) if pid != 2]
+        # снимка процесса 2 уже нет, остальные свежие
+        cache.set_many({key: {} for key in keys})
+        threads = [threading.Thread(target=slowlog._register, args=(key,))
+                   for key in keys[1:]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(cache.get(slowlog.PROCESSES_KEY)),
+                         sorted(keys))
+        self.assertIsNone(cache.get(slowlog.REGISTRY_LOCK_KEY))
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_reset_reaches_other_workers(self):
+        """Воркер не возвращает в кэш отпечатки, сброшенные в другом
+        процессе."""
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(self.url)
+        self.assertTrue(slowlog.collect())
+        # сброс в другом процессе: кэш чист, а наши _entries остались
+        with mock.patch.object(slowlog, '_entries', {}), \
+                mock.patch.object(slowlog, '_reset_at'):
+            slowlog.reset()
+        slowlog._dirty = True
+        self.assertEqual(slowlog.collect(), [])
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(self.url, {'page': 2})
+        self.assertTrue(slowlog.collect())
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_command(self):
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(self.url)
+        out = StringIO()
+        call_command('slow_queries', '--limit', '1', stdout=out)
+        self.assertIn('posts:profile ×1', out.getvalue())
+        expected = len(slowlog.collect())
+        out = StringIO()
+        call_command('slow_queries', '--json', '--reset', '--limit', '100',
+                     stdout=out)
+        self.assertEqual(len(json.loads(out.getvalue())), expected)
+        self.assertEqual(slowlog.collect(), [])
+        out = StringIO()
+        call_command('slow_queries', stdout=out)
+        self.assertIn('Медленных запросов не было', out.getvalue())
@@ -0,0 +1,39 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase
+
+from ..storage import InMemoryStorage
+
+
+class InMemoryStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.storage = InMemoryStorage()
+
+    @skipUnless(settings.SETTINGS_MODULE == 'yatube.settings_test',
+                'тесты запущены не с yatube.settings_test')
+    def test_tests_use_memory_storage(self):
+        self.assertIsInstance(default_storage._wrapped, InMemoryStorage)
+
+    def test_save_open_delete(self):
+        name = self.storage.save('storage-test/a.txt', ContentFile(b'data'))
+        self.assertEqual(name, 'storage-test/a.txt')
+        # второй файл с тем же именем получает новое имя
+        other = self.storage.save('storage-test/a.txt', ContentFile(b'other'))
+        self.assertNotEqual(other, name)
+        # экземпляры делят файлы, как default_storage и хранилище sorl
+        with InMemoryStorage().open(name) as file:
+            self.assertEqual(file.read(), b'data')
+        self.assertEqual(self.storage.size(name), 4)
+        self.assertEqual(self.storage.url(name), '/media/storage-test/a.txt')
+        nested = self.storage.save('storage-test/cache/b.txt',
+                                   ContentFile(b'b'))
+        self.assertEqual(self.storage.listdir('storage-test'), (
+            ['cache'], sorted(path.split('/')[1] for path in (name, other))))
+        for saved in (name, other, nested):
+            self.storage.delete(saved)
+        self.assertFalse(self.storage.exists(name))
+        with self.assertRaises(FileNotFoundError):
+            self.storage.open(name)
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import render as render_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -17,3 +21,14 @@ def csrf_failure(request, reason=''):
 
 def server_error(request, *args, **argv):
     return render(request, 'core/500.html', {'path': request.path}, status=500)
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus; только для своих адресов и staff."""
+    if (request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS
+            and not request.user.is_staff):
+        raise Http404
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
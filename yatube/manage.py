@@ -5,6 +5,10 @@ import sys
 
 
 def main():
+    if sys.argv[1:2] == ['test']:
+        # тесты по умолчанию с тестовыми настройками; DJANGO_SETTINGS_MODULE
+        # из окружения или --settings по-прежнему главнее
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings_test')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
     try:
         from django.core.management import execute_from_command_line
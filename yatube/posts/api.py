@@ -0,0 +1,191 @@
+"""JSON API для чтения лент и постов.
+
+Ответы собираются из values(), без создания экземпляров моделей и без
+шаблонов. Страницы листаются курсором (?cursor=), набор полей задаётся
+через ?fields=, а ?ids= отдаёт много постов одним запросом.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from . import timeline
+from .decorators import cache_anonymous
+from .models import Group, Post, User
+from .paginators import FEED_ORDERING, CursorPaginator
+from .views import (group_feeds, group_modified, index_feeds, index_modified,
+                    post_feeds, post_modified, profile_feeds,
+                    profile_modified)
+
+# поле ответа -> поле values()
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+    'author': 'author__username',
+    'author_name': None,
+    'group': 'group__slug',
+    'group_title': 'group__title',
+}
+# имя автора собирается из двух колонок
+AUTHOR_NAME = ('author__first_name', 'author__last_name')
+# параметры, от которых зависит ответ; по ним строится ключ кэша
+API_PARAMS = ('cursor', 'limit', 'fields')
+
+
+class BadRequest(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    # кириллица без \uXXXX-экранирования заметно короче
+    return JsonResponse(data, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def error(message, status=400):
+    return json_response({'error': message}, status=status)
+
+
+def api_view(view):
+    """GET-only view, который превращает BadRequest в ответ 400."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, **kwargs):
+        try:
+            return view(request, **kwargs)
+        except BadRequest as exc:
+            return error(str(exc))
+    return wrapper
+
+
+def requested_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(FIELDS)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def lookups(fields):
+    columns = set()
+    for field in fields:
+        if field == 'author_name':
+            columns.update(AUTHOR_NAME)
+        else:
+            columns.add(FIELDS[field])
+    # ключ сортировки нужен курсору, даже если его не просили
+    columns.update(order.lstrip('-') for order in FEED_ORDERING)
+    return sorted(columns)
+
+
+def serialize(row, fields):
+    data = {}
+    for field in fields:
+        if field == 'author_name':
+            data[field] = ' '.join(
+                filter(None, (row[column] for column in AUTHOR_NAME))
+            )
+        elif field == 'image':
+            data[field] = (default_storage.url(row['image'])
+                           if row['image'] else None)
+        else:
+            data[field] = row[FIELDS[field]]
+    return data
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.COUNT_PAGES))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def feed_response(request, queryset):
+    fields = requested_fields(request)
+    paginator = CursorPaginator(
+        queryset.values(*lookups(fields)), page_size(request)
+    )
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': [serialize(row, fields) for row in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    })
+
+
+@api_view
+def posts(request):
+    """Главная лента или посты по списку ?ids=1,2,3."""
+    if 'ids' in request.GET:
+        return batch(request)
+    return index(request)
+
+
+@cache_anonymous(index_feeds, index_modified, params=API_PARAMS)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+def batch(request):
+    try:
+        ids = [int(pk) for pk in request.GET['ids'].split(',') if pk]
+    except ValueError:
+        raise BadRequest('ids должны быть числами через запятую')
+    if len(ids) > settings.API_MAX_PAGE_SIZE:
+        raise BadRequest(
+            f'Не больше {settings.API_MAX_PAGE_SIZE} id за запрос'
+        )
+    fields = requested_fields(request)
+    rows = {
+        row['id']: row
+        for row in Post.objects.filter(id__in=ids).values(*lookups(fields))
+    }
+    # посты отдаются в порядке запроса, отсутствующие пропускаются
+    return json_response({
+        'results': [serialize(rows[pk], fields) for pk in ids if pk in rows],
+    })
+
+
+@api_view
+@cache_anonymous(group_feeds, group_modified, params=API_PARAMS)
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('id'), slug=slug)
+    return feed_response(request, Post.objects.filter(group=group))
+
+
+@api_view
+@cache_anonymous(profile_feeds, profile_modified, params=API_PARAMS)
+def profile(request, username):
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    return feed_response(request, Post.objects.filter(author=author))
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', status=401)
+    if timeline.enabled():
+        timeline.pull(request.user)
+        queryset = Post.objects.filter(timeline_entries__user=request.user)
+    else:
+        queryset = Post.objects.filter(author__following__user=request.user)
+    return feed_response(request, queryset)
+
+
+@api_view
+@cache_anonymous(post_feeds, post_modified, params=API_PARAMS)
+def post_detail(request, post_id):
+    fields = requested_fields(request)
+    row = Post.objects.filter(id=post_id).values(*lookups(fields)).first()
+    if row is None:
+        return error('Пост не найден', status=404)
+    return json_response(serialize(row, fields))
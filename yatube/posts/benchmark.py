@@ -0,0 +1,358 @@
+"""Синтетические данные и замеры лент под нагрузкой.
+
+seed() наполняет базу пользователями, группами, постами, подписками и
+комментариями. Активность авторов и число их подписчиков распределены
+по степенному закону (вес автора с рангом r равен 1 / r ** alpha), так
+что у первых авторов тысячи подписчиков, а у большинства — единицы.
+Один и тот же seed даёт одни и те же данные.
+
+run() проходит по лентам тестовым клиентом Django внутри процесса —
+без сети, но через все middleware, кэш и шаблоны — и возвращает
+p50/p95/p99 времени ответа, число SQL-запросов на запрос и пропускную
+способность по каждой ленте.
+"""
+import datetime
+import itertools
+import random
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.urls import reverse
+
+from . import counters, feed_cache, imports, search, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+PREFIX = 'bench'
+START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+POST_INTERVAL = 600
+VOCABULARY = 5000
+GROUP_SHARE = 0.8
+READERS = 20
+HOST = 'localhost'
+
+ENDPOINTS = ('index', 'group_posts', 'profile', 'follow_index',
+             'post_detail', 'add_comment')
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _power_law(count, alpha):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(itertools.accumulate(
+        1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+WORDS = [f'слово{rank}' for rank in range(VOCABULARY)]
+WORD_RANKS = _power_law(VOCABULARY, 1)
+
+
+def _text(rng):
+    return ' '.join(rng.choices(WORDS, cum_weights=WORD_RANKS,
+                                k=rng.randint(5, 40)))
+
+
+def seeded():
+    return User.objects.filter(username__startswith=f'{PREFIX}_').exists()
+
+
+def _seed_posts(rng, count, user_ids, ranks, group_ids, group_ranks,
+                batch_size):
+    """Посты по одному в POST_INTERVAL секунд; возвращает счёт по авторам."""
+    per_author = dict.fromkeys(user_ids, 0)
+
+    def build():
+        for number in range(count):
+            author_id = rng.choices(user_ids, cum_weights=ranks)[0]
+            per_author[author_id] += 1
+            group_id = None
+            if group_ids and rng.random() < GROUP_SHARE:
+                group_id = rng.choices(group_ids, cum_weights=group_ranks)[0]
+            yield Post(
+                text=_text(rng),
+                pub_date=START + datetime.timedelta(
+                    seconds=number * POST_INTERVAL
+                    + rng.randrange(POST_INTERVAL)),
+                author_id=author_id,
+                group_id=group_id,
+            )
+
+    with imports.keep_dates(Post, 'pub_date'):
+        imports.bulk_insert(Post, build(), batch_size,
+                            after_batch=search.index_posts)
+    return per_author
+
+
+def _seed_follows(rng, follows, user_ids, ranks, batch_size):
+    """Подписки к авторам по их рангу; возвращает счётчики в обе стороны."""
+    followers = dict.fromkeys(user_ids, 0)
+    following = dict.fromkeys(user_ids, 0)
+
+    def build():
+        for user_id in user_ids:
+            wanted = rng.randint(0, 2 * follows)
+            authors = set(rng.choices(user_ids, cum_weights=ranks, k=wanted))
+            authors.discard(user_id)
+            following[user_id] = len(authors)
+            for author_id in sorted(authors):
+                followers[author_id] += 1
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    imports.bulk_insert(Follow, build(), batch_size)
+    return followers, following
+
+
+def _seed_comments(rng, count, posts, user_ids, ranks, batch_size):
+
+    def build():
+        for _ in range(count if posts else 0):
+            post_id, pub_date = rng.choice(posts)
+            yield Comment(
+                post_id=post_id,
+                author_id=rng.choices(user_ids, cum_weights=ranks)[0],
+                text=_text(rng),
+                created=pub_date + datetime.timedelta(
+                    seconds=rng.randrange(86400)),
+            )
+
+    with imports.keep_dates(Comment, 'created'):
+        return imports.bulk_insert(Comment, build(), batch_size)
+
+
+def seed(posts=10000, users=1000, groups=20, follows=20, comments=10000,
+         alpha=1.2, seed=0, batch_size=imports.BATCH_SIZE):
+    """Наполняет базу; возвращает число созданных объектов по моделям."""
+    rng = random.Random(seed)
+    password = make_password(None)
+    imports.bulk_insert(User, (
+        User(username=f'{PREFIX}_{rank:07d}', password=password)
+        for rank in range(users)
+    ), batch_size)
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{PREFIX}_'
+    ).order_by('username').values_list('id', flat=True))
+    ranks = _power_law(users, alpha)
+    imports.bulk_insert(Group, (
+        Group(title=f'Группа {rank}', slug=f'{PREFIX}-{rank}',
+              description=f'Синтетическая группа {rank}')
+        for rank in range(groups)
+    ), batch_size)
+    group_ids = list(Group.objects.filter(
+        slug__startswith=f'{PREFIX}-'
+    ).order_by('id').values_list('id', flat=True))
+
+    last_post = Post.objects.aggregate(last=Max('id'))['last'] or 0
+    per_author = _seed_posts(rng, posts, user_ids, ranks, group_ids,
+                             _power_law(groups, alpha), batch_size)
+    followers, following = _seed_follows(rng, follows, user_ids, ranks,
+                                         batch_size)
+    new_posts = list(Post.objects.filter(id__gt=last_post).order_by(
+        'id').values_list('id', 'pub_date'))
+    created_comments = _seed_comments(rng, comments, new_posts, user_ids,
+                                      ranks, batch_size)
+    imports.bulk_insert(AuthorStats, (
+        AuthorStats(author_id=user_id,
+                    posts_count=per_author[user_id],
+                    followers_count=followers[user_id],
+                    following_count=following[user_id])
+        for user_id in user_ids
+    ), batch_size)
+
+    readers = [user_id for user_id in user_ids if following[user_id]]
+    if timeline.enabled():
+        for start in range(0, len(readers), 500):
+            timeline.rebuild(readers[start:start + 500])
+    feeds = [(counters.INDEX, None)]
+    feeds += [(counters.AUTHOR, pk) for pk in user_ids]
+    feeds += [(counters.GROUP, pk) for pk in group_ids]
+    counters.invalidate(
+        *(counters.count_key(*feed) for feed in feeds),
+        # подписки вставлены без сигналов
+        *(counters.following_key(pk) for pk in readers),
+    )
+    feed_cache.bump_all()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(new_posts),
+        'follows': sum(following.values()),
+        'comments': created_comments,
+    }
+
+
+def dataset():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'follows': Follow.objects.count(),
+        'comments': Comment.objects.count(),
+    }
+
+
+class Plan:
+    """Случайные адреса для лент, повторяемые при том же seed.
+
+    Профили выбираются пропорционально числу подписчиков автора,
+    ленты подписок и комментарии — от имени пользователей с подписками.
+    """
+
+    def __init__(self, seed=0, pages=1):
+        self.rng = random.Random(seed)
+        self.pages = pages
+        self.slugs = list(Group.objects.order_by('id').values_list(
+            'slug', flat=True))
+        authors = list(AuthorStats.objects.filter(
+            posts_count__gt=0
+        ).order_by('author_id').values_list(
+            'author__username', 'followers_count'))
+        self.authors = [username for username, _ in authors]
+        self.author_ranks = list(itertools.accumulate(
+            followers + 1 for _, followers in authors))
+        readers = list(AuthorStats.objects.filter(
+            following_count__gt=0
+        ).order_by('author_id').values_list('author_id', flat=True))
+        self.readers = self.rng.sample(readers, min(READERS, len(readers)))
+        bounds = Post.objects.aggregate(first=Min('id'),
+                                        last=Max('id'))
+        self.first_post, self.last_post = bounds['first'], bounds['last']
+        if not (self.slugs and self.authors and self.readers
+                and self.last_post):
+            raise ValueError('В базе нет групп, постов или подписок')
+
+    def page(self, url):
+        return f'{url}?page={self.rng.randint(1, self.pages)}'
+
+    def post_id(self):
+        return Post.objects.filter(
+            id__gte=self.rng.randint(self.first_post, self.last_post)
+        ).order_by('id').values_list('id', flat=True).first()
+
+    def request(self, endpoint):
+        """(метод, адрес, данные, пользователь или None)."""
+        reader = self.rng.choice(self.readers)
+        if endpoint == 'index':
+            return 'get', self.page(reverse('posts:index')), None, None
+        if endpoint == 'group_posts':
+            url = reverse('posts:group_posts',
+                          args=(self.rng.choice(self.slugs),))
+            return 'get', self.page(url), None, None
+        if endpoint == 'profile':
+            username = self.rng.choices(self.authors,
+                                        cum_weights=self.author_ranks)[0]
+            url = reverse('posts:profile', args=(username,))
+            return 'get', self.page(url), None, None
+        if endpoint == 'follow_index':
+            return 'get', self.page(reverse('posts:follow_index')), None, \
+                reader
+        if endpoint == 'post_detail':
+            url = reverse('posts:post_detail', args=(self.post_id(),))
+            return 'get', url, None, None
+        if endpoint == 'add_comment':
+            url = reverse('posts:add_comment', args=(self.post_id(),))
+            return 'post', url, {'text': 'Комментарий бенчмарка'}, reader
+        raise ValueError(f'Неизвестная лента: {endpoint}')
+
+
+def percentile(values, quantile):
+    values = sorted(values)
+    return values[min(int(quantile * len(values)), len(values) - 1)]
+
+
+def _worker(requests, readers, cold, results):
+    guest = Client(HTTP_HOST=HOST)
+    clients = {}
+    for user in User.objects.filter(id__in=readers):
+        clients[user.id] = Client(HTTP_HOST=HOST)
+        clients[user.id].force_login(user)
+    executed = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal executed
+        executed += 1
+        return execute(sql, params, many, context)
+
+    try:
+        for method, url, data, reader in requests:
+            client = guest if reader is None else clients[reader]
+            if cold:
+                cache.clear()
+            executed = 0
+            with connection.execute_wrapper(count):
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                duration = time.perf_counter() - started
+            results.append((duration, executed, response.status_code < 400))
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def _summary(results, elapsed):
+    durations = [duration * 1000 for duration, _, _ in results]
+    queries = [executed for _, executed, _ in results]
+    latency = {
+        f'p{int(quantile * 100)}': round(percentile(durations, quantile), 2)
+        for quantile in QUANTILES
+    }
+    latency['mean'] = round(sum(durations) / len(durations), 2)
+    latency['max'] = round(max(durations), 2)
+    return {
+        'requests': len(results),
+        'errors': sum(not ok for _, _, ok in results),
+        'latency_ms': latency,
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        },
+        'throughput_rps': round(len(results) / elapsed, 1),
+    }
+
+
+def measure(plan, endpoint, requests=100, warmup=10, threads=1, cold=False):
+    """Прогоняет один эндпоинт; прогрев в замер не входит."""
+    batch = [plan.request(endpoint) for _ in range(warmup + requests)]
+    _worker(batch[:warmup], plan.readers, cold, [])
+    batch = batch[warmup:]
+    results = []
+    started = time.perf_counter()
+    if threads == 1:
+        _worker(batch, plan.readers, cold, results)
+    else:
+        workers = [
+            threading.Thread(target=_worker, args=(
+                batch[number::threads], plan.readers, cold, results))
+            for number in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return _summary(results, time.perf_counter() - started)
+
+
+def run(endpoints=ENDPOINTS, requests=100, warmup=10, threads=1, pages=1,
+        cold=False, seed=0):
+    """Замеры по лентам; комментарии, оставленные замером, удаляются."""
+    plan = Plan(seed, pages)
+    last_comment = Comment.objects.aggregate(last=Max('id'))['last'] or 0
+    try:
+        report = {
+            'dataset': dataset(),
+            'params': {
+                'requests': requests, 'warmup': warmup, 'threads': threads,
+                'pages': pages, 'cold': cold, 'seed': seed,
+                'vendor': connection.vendor,
+            },
+            'endpoints': {
+                endpoint: measure(plan, endpoint, requests, warmup, threads,
+                                  cold)
+                for endpoint in endpoints
+            },
+        }
+    finally:
+        Comment.objects.filter(id__gt=last_comment).delete()
+    return report
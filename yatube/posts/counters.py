@@ -0,0 +1,101 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+INDEX = 'index'
+GROUP = 'group'
+AUTHOR = 'author'
+FOLLOW = 'follow'
+# посты автора в лентах подписок его читателей
+POSTS = 'posts'
+POST = 'post'
+SEARCH = 'search'
+
+
+def count_key(feed, pk=None):
+    if pk is None:
+        return f'feed_count:{feed}'
+    return f'feed_count:{feed}:{pk}'
+
+
+def invalidate(*keys):
+    cache.delete_many(keys)
+
+
+def post_feeds(post, group_ids=(), author_ids=()):
+    """Ленты (feed, pk), в которые попадает пост.
+
+    group_ids и author_ids — прежние группа и автор изменённого поста:
+    из их лент пост пропадает. Ленты подписок читателей не
+    перечисляются: у автора одно поколение POSTS, которое входит в
+    ключи их лент (см. follow_feeds), поэтому пост популярного автора
+    стоит одной записи в кэш, а не записи на каждого подписчика.
+    """
+    author_ids = {post.author_id, *author_ids}
+    feeds = [(INDEX, None), (POST, post.id)]
+    feeds.extend((AUTHOR, author_id) for author_id in author_ids)
+    feeds.extend((POSTS, author_id) for author_id in author_ids)
+    for group_id in {post.group_id, *group_ids}:
+        if group_id is not None:
+            feeds.append((GROUP, group_id))
+    return feeds
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def follow_feeds(user_id):
+    """Ленты, от которых зависит лента подписок пользователя.
+
+    Это его собственная лента FOLLOW (подписки и отписки) и поколения
+    POSTS всех авторов, на которых он подписан. Список авторов
+    хранится в кэше и сбрасывается сигналами Follow.
+    """
+    from .models import Follow
+
+    key = following_key(user_id)
+    authors = cache.get(key)
+    if authors is None:
+        authors = sorted(Follow.objects.filter(
+            user_id=user_id).values_list('author_id', flat=True))
+        cache.set(key, authors, settings.FEED_COUNT_TIMEOUT)
+    return [(FOLLOW, user_id)] + [(POSTS, author_id) for author_id in authors]
+
+
+def follow_count_key(user_id, version):
+    """Ключ числа постов в ленте подписок для строки поколений `version`.
+
+    Старые ключи не удаляются, а вытесняются по таймауту.
+    """
+    digest = hashlib.md5(version.encode()).hexdigest()
+    return count_key(FOLLOW, f'{user_id}:{digest}')
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт общее число записей ленты из кэша.
+
+    Счётчик хранится под ключом `count_key` и сбрасывается сигналами
+    при сохранении и удалении постов и подписок. Если число записей уже
+    известно (например, из AuthorStats), его можно передать в `count`.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, count=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        if count is not None:
+            self.count = count
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return Paginator.count.func(self)
+        count = cache.get(self.count_key)
+        if count is None:
+            count = Paginator.count.func(self)
+            cache.set(self.count_key, count, settings.FEED_COUNT_TIMEOUT)
+        return count
@@ -0,0 +1,98 @@
+import calendar
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import (http_date, parse_http_date_safe, quote_etag,
+                               urlencode)
+
+from . import feed_cache
+
+# параметры запроса, которые читают страницы лент; остальные (utm-метки,
+# случайный мусор) не должны плодить копии страницы в кэше
+PAGE_PARAMS = ('page', 'cursor', 'q')
+
+
+def _timestamp(value):
+    return None if value is None else calendar.timegm(value.utctimetuple())
+
+
+def cached_lookup(key, queryset):
+    """Первое значение queryset, закэшированное на время жизни страниц.
+
+    Поиск объекта по slug или имени нужен, чтобы узнать его ленты
+    ещё до вызова view; без кэша он стоил бы запроса даже при ответе 304.
+    Группу и автора view берёт отсюда же, поэтому страница с готовым
+    фрагментом ленты не ищет их в базе. Значения сбрасывают сигналы.
+    """
+    key = f'page_lookup:{key}'
+    value = cache.get(key)
+    if value is None:
+        value = queryset.first()
+        if value is not None:
+            cache.set(key, value, settings.PAGE_CACHE_TIMEOUT)
+    return value
+
+
+def forget_lookups(*keys):
+    """Сбрасывает значения cached_lookup, когда объект изменён или удалён."""
+    cache.delete_many([f'page_lookup:{key}' for key in keys])
+
+
+def page_path(request, params):
+    """Путь страницы только с теми параметрами, которые читает view."""
+    query = urlencode(sorted(
+        (name, request.GET.getlist(name))
+        for name in params if name in request.GET
+    ), doseq=True)
+    return f'{request.path}?{query}' if query else request.path
+
+
+def cache_anonymous(feeds, last_modified, params=PAGE_PARAMS):
+    """Кэширует страницу целиком для анонимных посетителей.
+
+    `feeds(request, **kwargs)` возвращает ленты, поколения которых
+    определяют ETag страницы (или None, если объекта нет), а
+    `last_modified(request, **kwargs)` — время последнего изменения.
+    Повторный запрос с If-None-Match получает 304 без обращения к базе,
+    а закэшированный ответ отдаётся без рендера шаблонов. Ключ страницы
+    строится из пути и параметров `params`, которые читает view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, **kwargs)
+            scope = feeds(request, **kwargs)
+            if scope is None:
+                return view(request, **kwargs)
+            path = page_path(request, params)
+            digest = hashlib.md5(
+                f'{path}|{feed_cache.versions(*scope)}'.encode()
+            ).hexdigest()
+            etag = quote_etag(digest)
+            key = f'anonymous_page:{digest}'
+            response = cache.get(key)
+            if response is not None:
+                modified = parse_http_date_safe(response.get('Last-Modified'))
+            else:
+                modified = _timestamp(last_modified(request, **kwargs))
+            conditional = get_conditional_response(
+                request, etag=etag, last_modified=modified, response=response
+            )
+            if conditional is not None and conditional is not response:
+                return conditional
+            if response is None:
+                response = view(request, **kwargs)
+                if response.status_code != 200 or response.cookies:
+                    return response
+                response['ETag'] = etag
+                if modified is not None:
+                    response['Last-Modified'] = http_date(modified)
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,71 @@
+"""Потоковая выгрузка постов, комментариев и подписок.
+
+Строки читаются из базы курсором через iterator(chunk_size=...) и сразу
+превращаются в строки NDJSON или CSV, поэтому память не зависит от
+размера таблицы.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+
+# что выгружать: queryset, колонки и поле даты для --since
+EXPORTS = {
+    'posts': (
+        Post.objects.all(),
+        ('id', 'text', 'pub_date', 'author__username', 'group__slug',
+         'image'),
+        'pub_date',
+    ),
+    'comments': (
+        Comment.objects.all(),
+        ('id', 'post_id', 'author__username', 'text', 'created'),
+        'created',
+    ),
+    'follows': (
+        Follow.objects.all(),
+        ('id', 'user__username', 'author__username'),
+        None,
+    ),
+}
+FORMATS = ('ndjson', 'csv')
+CHUNK_SIZE = 2000
+
+
+def rows(name, queryset=None, since=None, chunk_size=CHUNK_SIZE):
+    """Строки выгрузки в виде словарей, по порядку id."""
+    default_queryset, fields, date_field = EXPORTS[name]
+    if queryset is None:
+        queryset = default_queryset
+    if since is not None:
+        if date_field is None:
+            raise ValueError(f'У выгрузки {name} нет даты для since')
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    return queryset.order_by('id').values(*fields).iterator(
+        chunk_size=chunk_size
+    )
+
+
+class _Line:
+    """Файл для csv.writer, который просто возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def lines(name, format, row_iterator):
+    """Строки файла выгрузки в нужном формате."""
+    if format == 'ndjson':
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for row in row_iterator:
+            yield encoder.encode(row) + '\n'
+        return
+    fields = EXPORTS[name][1]
+    writer = csv.writer(_Line())
+    yield writer.writerow(fields)
+    for row in row_iterator:
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in (row[field] for field in fields)
+        ])
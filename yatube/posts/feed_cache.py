@@ -0,0 +1,86 @@
+"""Кэш отрендеренных страниц лент с номерами поколений.
+
+У каждой ленты есть поколение в кэше; любое изменение, видимое в ленте,
+увеличивает его. Поколение входит в ключ фрагмента, поэтому после
+изменения шаблон сразу берёт свежий фрагмент, а старые вытесняются
+по таймауту. Общее поколение ALL меняется при правке групп и имён
+авторов, которые видны во всех лентах.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.functional import SimpleLazyObject
+
+ALL = ('all', None)
+
+
+def version_key(feed, pk=None):
+    if pk is None:
+        return f'feed_version:{feed}'
+    return f'feed_version:{feed}:{pk}'
+
+
+def _fresh_version():
+    # после вытеснения ключа поколение не должно повториться
+    return int(time.time() * 1000)
+
+
+def versions(*feeds):
+    """Строка вида `feed_version:index=12;...` для ключа кэша."""
+    keys = [version_key(*feed) for feed in (ALL, *feeds)]
+    found = cache.get_many(keys)
+    missing = {key: _fresh_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return ';'.join(f'{key}={found[key]}' for key in keys)
+
+
+def bump(*feeds):
+    for feed in feeds:
+        key = version_key(*feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+
+
+def bump_all():
+    bump(ALL)
+
+
+def cached(name, version, compute):
+    """Значение compute(), закэшированное для строки поколений `version`.
+
+    Как только одна из лент получает новое поколение, ключ меняется
+    и значение считается заново; старые ключи вытесняются по таймауту.
+    """
+    digest = hashlib.md5(f'{name}|{version}'.encode()).hexdigest()
+    key = f'feed_value:{digest}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, settings.FEED_CACHE_TIMEOUT)
+    return value
+
+
+def feed_context(request, fragment, *feeds, page, position, version=None):
+    """Контекст шаблона для фрагмента ленты под {% cache %}.
+
+    Если фрагмент уже в кэше, `page` вычисляется лениво: шаблон его не
+    трогает, и страница не стоит ни одного запроса к базе. `position` —
+    номер страницы или курсор из paginators.page_position; `version` —
+    уже прочитанные versions(*feeds), если они нужны и самому view.
+    """
+    if version is None:
+        version = versions(*feeds)
+    key = f'{version}:{position}'
+    cached = cache.get(make_template_fragment_key(fragment, [key]))
+    return {
+        'page_obj': page() if cached is None else SimpleLazyObject(page),
+        'feed_cache_key': key,
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
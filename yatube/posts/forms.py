@@ -1,5 +1,6 @@
 from django import forms
 
+from . import images
 from .models import Post, Comment
 
 
@@ -9,6 +10,13 @@ class PostForm(forms.ModelForm):
         fields = ('text', 'group', 'image')
         labels = {'text': 'Текст', 'group': 'Группа', 'image': 'Картинки'}
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # пересохраняем только новую загрузку, а не уже сохранённый файл
+        if image and 'image' in self.changed_data:
+            return images.normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,87 @@
+"""Нормализация загружаемых картинок постов.
+
+Оригинал после загрузки больше не хранится как есть: картинка
+поворачивается по EXIF, уменьшается до IMAGE_MAX_SIDE по большей
+стороне и пересохраняется без метаданных в JPEG (или PNG, если есть
+прозрачность). Так хранилище не растёт от многомегабайтных снимков,
+а генерация миниатюр декодирует небольшой файл.
+"""
+import os
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+# качество JPEG не опускается ниже, даже если файл остаётся большим
+MIN_QUALITY = 50
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def _open(upload):
+    upload.seek(0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        try:
+            # читается только заголовок, пиксели ещё не декодированы
+            image = Image.open(upload)
+        except (Image.DecompressionBombWarning,
+                Image.DecompressionBombError):
+            image = None
+    if image is None or image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: не больше %(pixels)s пикселей.',
+            code='too_large',
+            params={'pixels': settings.IMAGE_MAX_PIXELS},
+        )
+    return image
+
+
+def _encode(image, image_format, quality=None):
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=quality, optimize=True,
+                   progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _reencode(image):
+    side = settings.IMAGE_MAX_SIDE
+    # JPEG можно сразу декодировать в уменьшенном масштабе
+    image.draft('RGB', (side, side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((side, side), Image.LANCZOS)
+    if _has_alpha(image):
+        return 'PNG', '.png', _encode(image.convert('RGBA'), 'PNG')
+    image = image.convert('RGB')
+    quality = settings.IMAGE_QUALITY
+    content = _encode(image, 'JPEG', quality)
+    while len(content) > settings.IMAGE_MAX_BYTES and quality > MIN_QUALITY:
+        quality -= 10
+        content = _encode(image, 'JPEG', quality)
+    return 'JPEG', '.jpg', content
+
+
+def normalize(upload):
+    """Возвращает пересохранённую копию загруженной картинки."""
+    image = _open(upload)
+    try:
+        # заголовок уже проверен ImageField, но пиксели могут быть битыми
+        image_format, extension, content = _reencode(image)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Не удалось прочитать картинку: файл повреждён.',
+            code='invalid_image',
+        )
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    return SimpleUploadedFile(name, content,
+                              content_type=Image.MIME[image_format])
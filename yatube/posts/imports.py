@@ -0,0 +1,193 @@
+"""Массовая загрузка постов и комментариев.
+
+Файл читается потоково, авторы и группы ищутся по словарям в памяти,
+строки вставляются через bulk_create пачками, каждая в своей
+транзакции. Сигналы при bulk_create не отправляются, поэтому счётчики,
+ленты и кэш обновляются один раз в конце загрузки.
+"""
+import contextlib
+import csv
+import datetime
+import gzip
+import io
+import json
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import counters, feed_cache, search, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 5000
+
+
+def read_rows(path, format=None):
+    """Словари строк из NDJSON или CSV, в том числе сжатых gzip."""
+    name = path[:-3] if path.endswith('.gz') else path
+    if format is None:
+        format = 'csv' if name.endswith('.csv') else 'ndjson'
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as binary:
+        text = io.TextIOWrapper(binary, encoding='utf-8', newline='')
+        if format == 'csv':
+            yield from csv.DictReader(text)
+        else:
+            for line in text:
+                if line.strip():
+                    yield json.loads(line)
+
+
+@contextlib.contextmanager
+def keep_dates(model, field_name):
+    """Не даёт auto_now_add затереть дату из файла."""
+    field = model._meta.get_field(field_name)
+    auto_now_add = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = auto_now_add
+
+
+def _value(row, *keys):
+    for key in keys:
+        if row.get(key):
+            return row[key]
+    return None
+
+
+def _date(value):
+    """Дата из файла; без даты — сейчас, с ошибочной датой — None."""
+    if not value:
+        return timezone.now()
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime.datetime.combine(day, datetime.time())
+    except ValueError:
+        # формат верный, но такой даты нет: 2020-02-30
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _batches(objects, batch_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(model, objects, batch_size, after_batch=None):
+    """Вставляет объекты пачками, каждую в своей транзакции.
+
+    Сигналы не отправляются. `after_batch(batch)` вызывается внутри
+    транзакции пачки; возвращает число вставленных строк.
+    """
+    created = 0
+    for batch in _batches(objects, batch_size):
+        with transaction.atomic():
+            # размер одного INSERT подбирает бэкенд: SQLite ограничивает
+            # число параметров и слагаемых составного SELECT
+            model.objects.bulk_create(batch)
+            if after_batch is not None:
+                after_batch(batch)
+        created += len(batch)
+    return created
+
+
+def import_posts(rows, batch_size=BATCH_SIZE):
+    """Загружает посты; возвращает число созданных и пропущенных строк."""
+    authors = dict(User.objects.values_list('username', 'id'))
+    groups = dict(Group.objects.values_list('slug', 'id'))
+    per_author = {}
+    group_ids = set()
+    skipped = 0
+
+    def build():
+        nonlocal skipped
+        for row in rows:
+            author_id = authors.get(_value(row, 'author__username', 'author'))
+            slug = _value(row, 'group__slug', 'group')
+            group_id = groups.get(slug)
+            pub_date = _date(row.get('pub_date'))
+            if author_id is None or not row.get('text') or (
+                    slug and group_id is None) or pub_date is None:
+                skipped += 1
+                continue
+            per_author[author_id] = per_author.get(author_id, 0) + 1
+            group_ids.add(group_id)
+            yield Post(
+                text=row['text'],
+                pub_date=pub_date,
+                author_id=author_id,
+                group_id=group_id,
+                image=row.get('image') or '',
+            )
+
+    with keep_dates(Post, 'pub_date'):
+        # FTS5 обновляют триггеры, запасной индекс — явно
+        created = bulk_insert(Post, build(), batch_size,
+                              after_batch=search.index_posts)
+    for author_id, count in per_author.items():
+        AuthorStats.shift(author_id, posts_count=count)
+    followers = set(Follow.objects.filter(
+        author_id__in=per_author).values_list('user_id', flat=True))
+    if timeline.enabled() and followers:
+        timeline.rebuild(followers)
+    feeds = [(counters.INDEX, None)]
+    feeds += [(counters.AUTHOR, pk) for pk in per_author]
+    feeds += [(counters.GROUP, pk) for pk in group_ids if pk is not None]
+    counters.invalidate(*(counters.count_key(*feed) for feed in feeds))
+    feed_cache.bump_all()
+    return created, skipped
+
+
+def _post_id(row):
+    try:
+        return int(row.get('post_id'))
+    except (TypeError, ValueError):
+        return None
+
+
+def import_comments(rows, batch_size=BATCH_SIZE):
+    """Загружает комментарии к существующим постам."""
+    authors = dict(User.objects.values_list('username', 'id'))
+    skipped = 0
+
+    def build():
+        nonlocal skipped
+        for batch in _batches(rows, batch_size):
+            # нечисловой post_id пропускает строку, а не роняет запрос
+            parsed = [_post_id(row) for row in batch]
+            post_ids = set(Post.objects.filter(
+                id__in=[pk for pk in parsed if pk is not None]
+            ).values_list('id', flat=True))
+            for row, post_id in zip(batch, parsed):
+                author_id = authors.get(
+                    _value(row, 'author__username', 'author'))
+                moment = _date(row.get('created'))
+                if (author_id is None or post_id not in post_ids
+                        or not row.get('text') or moment is None):
+                    skipped += 1
+                    continue
+                yield Comment(
+                    post_id=post_id,
+                    author_id=author_id,
+                    text=row['text'],
+                    created=moment,
+                )
+
+    with keep_dates(Comment, 'created'):
+        created = bulk_insert(Comment, build(), batch_size)
+    feed_cache.bump_all()
+    return created, skipped
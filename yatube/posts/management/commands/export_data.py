@@ -0,0 +1,84 @@
+import gzip
+import io
+import sys
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts import exports
+
+
+def parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Не понимаю дату {value!r}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты, комментарии или подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(exports.EXPORTS))
+        parser.add_argument(
+            '--format', choices=exports.FORMATS, default='ndjson',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='файл для записи; по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='сжимать вывод gzip',
+        )
+        parser.add_argument(
+            '--since',
+            help='только записи с датой не раньше этой (ISO 8601)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=exports.CHUNK_SIZE,
+            help='сколько строк читать из базы за раз',
+        )
+
+    def open_output(self, path, compress):
+        """Текстовый поток для вывода и нужно ли его закрыть."""
+        if path == '-':
+            if not compress:
+                return self.stdout, False
+            binary = gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb')
+        elif compress:
+            binary = gzip.open(path, 'wb')
+        else:
+            return open(path, 'w', encoding='utf-8', newline=''), True
+        return io.TextIOWrapper(binary, encoding='utf-8', newline=''), True
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_since(options['since'])
+        try:
+            row_iterator = exports.rows(
+                options['name'], since=since,
+                chunk_size=options['chunk_size'],
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        output, close = self.open_output(options['output'], options['gzip'])
+        count = 0
+        try:
+            for line in exports.lines(options['name'], options['format'],
+                                      row_iterator):
+                output.write(line)
+                count += 1
+        finally:
+            if close:
+                output.close()
+        if options['format'] == 'csv':
+            count -= 1
+        self.stderr.write(f'Выгружено строк: {count}')
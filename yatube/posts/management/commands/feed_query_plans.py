@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class Command(BaseCommand):
+    help = 'Показывает планы и время запросов лент на текущей базе'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page', type=int, default=1,
+            help='номер страницы для OFFSET-запросов',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='сколько раз выполнить запрос для замера времени',
+        )
+
+    def get_shapes(self, page):
+        offset = (page - 1) * settings.COUNT_PAGES
+        window = slice(offset, offset + settings.COUNT_PAGES)
+        # пост, на котором заканчивается предыдущая страница
+        post = Post.objects.feed()[max(offset - 1, 0):][:1].first()
+        group = Group.objects.first()
+        follow = Follow.objects.first()
+        shapes = {
+            'index': Post.objects.feed()[window],
+        }
+        if post is not None:
+            shapes['index keyset'] = Post.objects.feed().filter(
+                Q(pub_date__lt=post.pub_date)
+                | Q(pub_date=post.pub_date, id__lt=post.id)
+            )[:settings.COUNT_PAGES]
+            shapes['profile'] = Post.objects.feed().filter(
+                author_id=post.author_id)[window]
+            shapes['comments'] = Comment.objects.filter(
+                post_id=post.id).select_related('author').order_by(
+                'created', 'id')[:settings.COMMENTS_PER_PAGE]
+        if group is not None:
+            shapes['group'] = Post.objects.feed().filter(group=group)[window]
+        if follow is not None:
+            shapes['follow'] = Post.objects.feed().filter(
+                author__following__user_id=follow.user_id)[window]
+            shapes['follow probe'] = Follow.objects.filter(
+                user_id=follow.user_id, author_id=follow.author_id)[:1]
+        return shapes
+
+    def handle(self, *args, **options):
+        for name, queryset in self.get_shapes(options['page']).items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{name}: {min(timings):.2f} ms'
+            ))
+            self.stdout.write(queryset.explain())
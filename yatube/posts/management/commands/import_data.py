@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import exports, imports
+
+IMPORTERS = {
+    'posts': imports.import_posts,
+    'comments': imports.import_comments,
+}
+
+
+class Command(BaseCommand):
+    help = 'Массово загружает посты или комментарии из NDJSON/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(IMPORTERS))
+        parser.add_argument(
+            'path', help='файл .ndjson или .csv, можно сжатый .gz',
+        )
+        parser.add_argument(
+            '--format', choices=exports.FORMATS,
+            help='формат файла, если его не видно по расширению',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=imports.BATCH_SIZE,
+            help='сколько строк вставлять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created, skipped = IMPORTERS[options['name']](
+            imports.read_rows(options['path'], options['format']),
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {created}, пропущено: {skipped}, '
+            f'{created / max(elapsed, 1e-6):.0f} строк/с'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids', nargs='*', type=int,
+            help='id читателей; по умолчанию все ленты',
+        )
+
+    def handle(self, *args, **options):
+        timeline.rebuild(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны'))
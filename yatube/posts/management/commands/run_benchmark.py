@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число SQL-запросов и пропускную '
+            'способность лент и выводит JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint', action='append', choices=benchmark.ENDPOINTS,
+            help='какие ленты замерять (по умолчанию все)',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='сколько запросов на ленту',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='сколько запросов сделать до замера',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='сколько клиентов шлют запросы одновременно',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=1,
+            help='страницы выбираются случайно из 1..pages',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='очищать кэш перед каждым запросом',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='файл для JSON вместо стандартного вывода',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = benchmark.run(
+                endpoints=options['endpoint'] or benchmark.ENDPOINTS,
+                requests=options['requests'],
+                warmup=options['warmup'],
+                threads=options['threads'],
+                pages=options['pages'],
+                cold=options['cold'],
+                seed=options['seed'],
+            )
+        except ValueError as error:
+            raise CommandError(
+                f'{error}; наполните базу командой seed_benchmark')
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(text + '\n')
+        else:
+            self.stdout.write(text)
@@ -0,0 +1,48 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark, imports
+
+
+class Command(BaseCommand):
+    help = 'Наполняет базу синтетическими данными для бенчмарка лент'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='среднее число подписок на пользователя',
+        )
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='показатель степенного закона для авторов и групп',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=imports.BATCH_SIZE,
+            help='сколько строк вставлять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        if benchmark.seeded():
+            raise CommandError(
+                'Данные бенчмарка уже есть: возьмите чистую базу')
+        started = time.perf_counter()
+        created = benchmark.seed(
+            posts=options['posts'],
+            users=options['users'],
+            groups=options['groups'],
+            follows=options['follows'],
+            comments=options['comments'],
+            alpha=options['alpha'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(json.dumps(created))
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с'))
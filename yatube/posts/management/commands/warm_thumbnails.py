@@ -0,0 +1,96 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import feed_cache, thumbnails
+from posts.models import Post
+
+
+def warm(name):
+    """Строит миниатюры одной картинки в процессе пула."""
+    try:
+        thumbnails.build(name)
+    except Exception as error:
+        return name, str(error)
+    return name, None
+
+
+class Command(BaseCommand):
+    help = 'Заранее строит миниатюры картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='сколько постов читать из базы за раз',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='число процессов; 0 — строить в текущем процессе',
+        )
+        parser.add_argument(
+            '--start-after', type=int, default=0,
+            help='id поста, после которого продолжить прерванный прогон',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='только посчитать картинки без миниатюр',
+        )
+
+    def batches(self, start_after, batch_size):
+        posts = Post.objects.exclude(image='').order_by('id')
+        last_id = start_after
+        while True:
+            batch = list(posts.filter(id__gt=last_id).values_list(
+                'id', 'image')[:batch_size])
+            if not batch:
+                return
+            last_id = batch[-1][0]
+            # одна картинка может быть у нескольких постов
+            names = {name for _, name in batch
+                     if not thumbnails.is_warm(name)}
+            yield last_id, len(batch), sorted(names)
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        pool = None
+        if workers and not options['dry_run']:
+            # процессы пула не должны делить соединение родителя
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers)
+        seen = built = failed = 0
+        try:
+            for last_id, count, names in self.batches(
+                options['start_after'], options['batch_size']
+            ):
+                seen += count
+                if options['dry_run']:
+                    built += len(names)
+                elif names:
+                    results = (pool.map(warm, names) if pool
+                               else map(warm, names))
+                    for name, error in results:
+                        if error is None:
+                            built += 1
+                        else:
+                            failed += 1
+                            self.stderr.write(f'{name}: {error}')
+                self.stdout.write(
+                    f'Постов: {seen}, миниатюр: {built}, ошибок: {failed}, '
+                    f'последний id: {last_id}'
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Нужно построить миниатюры для {built} картинок'
+            ))
+            return
+        if built:
+            # страницы с заглушками перерисуются с готовыми картинками
+            feed_cache.bump_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Построено миниатюр: {built}, ошибок: {failed}'
+        ))
@@ -0,0 +1,96 @@
+# Generated by Django 2.2.19 on 2026-10-18 11:25
+
+import re
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+# Копия схемы и токенизатора из posts.search на момент миграции:
+# правки живого модуля не должны менять то, что делает эта миграция.
+FTS_TABLE = 'posts_post_fts'
+FTS_SCHEMA = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    f" text, content='posts_post', content_rowid='id',"
+    f" tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert'
+    f' AFTER INSERT ON posts_post BEGIN'
+    f' INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);'
+    f' END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete'
+    f' AFTER DELETE ON posts_post BEGIN'
+    f' INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)'
+    f" VALUES ('delete', old.id, old.text);"
+    f' END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update'
+    f' AFTER UPDATE OF text ON posts_post BEGIN'
+    f' INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)'
+    f" VALUES ('delete', old.id, old.text);"
+    f' INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);'
+    f' END',
+)
+TOKEN = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+
+
+def tokenize(text):
+    return list(dict.fromkeys(
+        token[:MAX_TERM_LENGTH] for token in TOKEN.findall(text.lower())
+    ))
+
+
+def install_fts(cursor):
+    if cursor.db.vendor != 'sqlite':
+        return False
+    try:
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement)
+    except OperationalError:
+        return False
+    cursor.execute(
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"
+    )
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        if install_fts(cursor):
+            return
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    for post in Post.objects.only('id', 'text').iterator():
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post.id)
+            for term in tokenize(post.text)
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for suffix in ('insert', 'delete', 'update'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
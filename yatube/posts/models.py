@@ -1,9 +1,25 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F
 
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа одним JOIN, только нужные поля."""
+        return self.select_related('author', 'group').only(
+            'text',
+            'pub_date',
+            'image',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group__slug',
+            'group__title',
+        ).order_by('-pub_date', '-id')
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст')
     pub_date = models.DateTimeField(auto_now_add=True,
@@ -27,9 +43,19 @@ class Post(models.Model):
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self) -> str:
         text = self.text
@@ -70,6 +96,10 @@ class Comment(models.Model):
 
     class Meta:
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -89,5 +119,122 @@ class Follow(models.Model):
         related_name='following'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.author}'
+
+    @classmethod
+    def for_author(cls, author):
+        """Строка счётчиков автора; создаётся при первом обращении."""
+        stats = cls.objects.filter(author=author).first()
+        if stats is None:
+            stats = cls.recount(author.pk)
+        return stats
+
+    @classmethod
+    def recount(cls, author_id):
+        stats, _ = cls.objects.update_or_create(
+            author_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id).count(),
+                'followers_count': Follow.objects.filter(
+                    author_id=author_id).count(),
+                'following_count': Follow.objects.filter(
+                    user_id=author_id).count(),
+            },
+        )
+        return stats
+
+    @classmethod
+    def shift(cls, author_id, **deltas):
+        """Сдвигает счётчики атомарно через F()-выражения.
+
+        Если строки ещё нет, её посчитает `for_author` при первом чтении.
+        """
+        cls.objects.filter(author_id=author_id).update(**{
+            field: F(field) + delta for field, delta in deltas.items()
+        })
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class SearchTerm(models.Model):
+    """Запасной обратный индекс поиска для баз без SQLite FTS5."""
+
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'post'],
+                                    name='unique_search_term'),
+        ]
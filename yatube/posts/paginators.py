@@ -0,0 +1,238 @@
+import base64
+import binascii
+import json
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import counters
+from .counters import CachedCountPaginator
+
+FEED_ORDERING = ('-pub_date', '-id')
+# порядок комментариев: сначала старые или сначала новые
+COMMENT_ORDERINGS = {
+    'old': ('created', 'id'),
+    'new': ('-created', '-id'),
+}
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """Paginator админки, который не считает большие выборки целиком.
+
+    Без фильтров число постов берётся из кэшированного счётчика главной
+    ленты. Отфильтрованная выборка считается не дальше
+    ADMIN_COUNT_LIMIT строк: если совпадений больше, страниц будет
+    столько, сколько помещается в этот предел.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        count_key = None
+        if not object_list.query.where:
+            count_key = counters.count_key(counters.INDEX)
+        super().__init__(object_list, per_page, count_key=count_key,
+                         orphans=orphans,
+                         allow_empty_first_page=allow_empty_first_page)
+
+    @cached_property
+    def count(self):
+        if self.count_key is not None:
+            return CachedCountPaginator.count.func(self)
+        return self.object_list.order_by()[:settings.ADMIN_COUNT_LIMIT].count()
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Page):
+    """Страница ленты без номера: только ссылки вперёд и назад."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s items>' % len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator:
+    """Keyset-пагинация по упорядоченному набору полей.
+
+    Вместо OFFSET следующая страница выбирается условием «после
+    последней записи» по ключу сортировки, поэтому глубокие страницы
+    стоят столько же, сколько первая, и COUNT(*) не нужен.
+    Последнее поле сортировки должно быть уникальным (обычно `id`).
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    @staticmethod
+    def _field_name(order):
+        return order.lstrip('-')
+
+    @staticmethod
+    def _reverse(ordering):
+        return tuple(
+            order[1:] if order.startswith('-') else '-' + order
+            for order in ordering
+        )
+
+    def _key(self, obj):
+        names = [self._field_name(order) for order in self.ordering]
+        if isinstance(obj, dict):
+            return [obj[name] for name in names]
+        return [getattr(obj, name) for name in names]
+
+    def encode_cursor(self, direction, key):
+        payload = json.dumps(
+            [direction] + [str(value) for value in key],
+            separators=(',', ':'),
+        )
+        token = base64.urlsafe_b64encode(payload.encode())
+        return token.decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (TypeError, ValueError, binascii.Error):
+            raise InvalidCursor(cursor)
+        if (not isinstance(payload, list)
+                or len(payload) != len(self.ordering) + 1
+                or payload[0] not in (NEXT, PREVIOUS)):
+            raise InvalidCursor(cursor)
+        model = self.object_list.model
+        key = []
+        for order, value in zip(self.ordering, payload[1:]):
+            field = model._meta.get_field(self._field_name(order))
+            try:
+                value = field.to_python(value)
+            except ValidationError:
+                raise InvalidCursor(cursor)
+            if value is None:
+                raise InvalidCursor(cursor)
+            key.append(value)
+        return payload[0], key
+
+    def _seek(self, ordering, key):
+        """Условие «строго после key» для данного порядка сортировки."""
+        condition = Q()
+        for position, order in enumerate(ordering):
+            name = self._field_name(order)
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': key[position]})
+            for prev_order, value in zip(ordering[:position], key):
+                step &= Q(**{self._field_name(prev_order): value})
+            condition |= step
+        return condition
+
+    def page(self, direction=None, key=None):
+        ordering = self.ordering
+        if direction == PREVIOUS:
+            ordering = self._reverse(ordering)
+        queryset = self.object_list.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self._seek(ordering, key))
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction == PREVIOUS:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, key is not None
+        next_cursor = previous_cursor = None
+        if items and has_next:
+            next_cursor = self.encode_cursor(NEXT, self._key(items[-1]))
+        if items and has_previous:
+            previous_cursor = self.encode_cursor(
+                PREVIOUS, self._key(items[0])
+            )
+        return CursorPage(items, self, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """Как Paginator.get_page: битый курсор ведёт на первую страницу."""
+        if not cursor:
+            return self.page()
+        try:
+            direction, key = self.decode_cursor(cursor)
+        except InvalidCursor:
+            return self.page()
+        return self.page(direction, key)
+
+
+def paginate(request, queryset, count_key=None, count=None,
+             ordering=FEED_ORDERING):
+    if settings.FEED_PAGINATION == 'cursor':
+        paginator = CursorPaginator(queryset, settings.COUNT_PAGES, ordering)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = CachedCountPaginator(
+        queryset, settings.COUNT_PAGES, count_key=count_key, count=count
+    )
+    return paginator.get_page(request.GET.get('page'))
+
+
+def page_position(request, queryset, count_key=None, count=None,
+                  ordering=FEED_ORDERING):
+    """Страница, которую выберет paginate, для ключа кэша ленты.
+
+    Битый курсор и нечисловой номер дают первую страницу, номер вне
+    диапазона — последнюю, если число записей уже известно. Так
+    мусорные ?page= и ?cursor= не плодят фрагменты в кэше. База не
+    трогается: число записей берётся только из кэша или из `count`.
+    """
+    if settings.FEED_PAGINATION == 'cursor':
+        paginator = CursorPaginator(queryset, settings.COUNT_PAGES, ordering)
+        cursor = request.GET.get('cursor')
+        if not cursor:
+            return '1'
+        try:
+            direction, key = paginator.decode_cursor(cursor)
+        except InvalidCursor:
+            return '1'
+        return paginator.encode_cursor(direction, key)
+    try:
+        number = int(request.GET.get('page'))
+    except (TypeError, ValueError):
+        return '1'
+    if count is None and count_key is not None:
+        count = cache.get(count_key)
+    if count is None:
+        return str(number) if number >= 1 else 'last'
+    last = max(1, ceil(count / settings.COUNT_PAGES))
+    return str(number if 1 <= number <= last else last)
+
+
+def paginate_comments(request, queryset):
+    """Страница комментариев по ?cursor= в порядке из ?order=."""
+    order = request.GET.get('order')
+    if order not in COMMENT_ORDERINGS:
+        order = 'old'
+    paginator = CursorPaginator(
+        queryset, settings.COMMENTS_PER_PAGE, COMMENT_ORDERINGS[order]
+    )
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    page_obj.order = order
+    return page_obj
@@ -0,0 +1,178 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite с FTS5 текст постов индексирует виртуальная таблица
+posts_post_fts (external content), которую синхронизируют триггеры на
+posts_post: индекс обновляется при любой записи, в том числе при
+bulk_create и update(). На других базах работает запасной обратный
+индекс SearchTerm, который обновляют сигналы.
+
+Django пересоздаёт таблицу posts_post на SQLite при некоторых
+миграциях, и триггеры при этом пропадают. После каждого migrate
+ensure_fts ставит их заново и переиндексирует посты; то же вручную
+делает `manage.py rebuild_search_index`.
+"""
+import functools
+import hashlib
+import re
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connection,
+                       connections, transaction)
+
+from . import counters, feed_cache
+
+FTS_TABLE = 'posts_post_fts'
+FTS_SCHEMA = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    f" text, content='posts_post', content_rowid='id',"
+    f" tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert'
+    f' AFTER INSERT ON posts_post BEGIN'
+    f' INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);'
+    f' END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete'
+    f' AFTER DELETE ON posts_post BEGIN'
+    f' INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)'
+    f" VALUES ('delete', old.id, old.text);"
+    f' END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update'
+    f' AFTER UPDATE OF text ON posts_post BEGIN'
+    f' INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)'
+    f" VALUES ('delete', old.id, old.text);"
+    f' INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);'
+    f' END',
+)
+FTS_TRIGGERS = tuple(
+    f'{FTS_TABLE}_{suffix}' for suffix in ('insert', 'delete', 'update'))
+TOKEN = re.compile(r'\w+')
+# длиннее слова в запасной индекс не попадают
+MAX_TERM_LENGTH = 64
+# больше слов из запроса не учитываем
+MAX_QUERY_TERMS = 8
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре, без повторов."""
+    return list(dict.fromkeys(
+        token[:MAX_TERM_LENGTH] for token in TOKEN.findall(text.lower())
+    ))
+
+
+def install_fts(cursor):
+    """Создаёт FTS5-индекс с триггерами; False, если FTS5 недоступен."""
+    if cursor.db.vendor != 'sqlite':
+        return False
+    try:
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement)
+    except OperationalError:
+        return False
+    cursor.execute(
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"
+    )
+    return True
+
+
+def ensure_fts(using=DEFAULT_DB_ALIAS):
+    """Ставит пропавшие триггеры FTS5 и переиндексирует посты.
+
+    Возвращает True, если триггеры пришлось ставить заново.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        if FTS_TABLE not in db.introspection.table_names(cursor):
+            return False
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'"
+            f" AND name IN ({', '.join(['%s'] * len(FTS_TRIGGERS))})",
+            FTS_TRIGGERS,
+        )
+        if cursor.fetchone()[0] == len(FTS_TRIGGERS):
+            return False
+        return install_fts(cursor)
+
+
+@functools.lru_cache(maxsize=None)
+def has_fts():
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def search(queryset, query):
+    """Посты из queryset, в тексте которых есть все слова запроса.
+
+    Последнее слово ищется как префикс, чтобы находить словоформы.
+    Через FTS5 берутся не больше SEARCH_MAX_RESULTS самых новых постов.
+    """
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset.none()
+    if has_fts():
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        # RawSQL в id__in превращается в скалярный подзапрос «IN ((...))»
+        # и отдаёт одну строку, поэтому условие пишется целиком
+        return queryset.extra(
+            where=[f'"posts_post"."id" IN (SELECT rowid FROM {FTS_TABLE}'
+                   f' WHERE {FTS_TABLE} MATCH %s'
+                   f' ORDER BY rowid DESC LIMIT %s)'],
+            params=[match, settings.SEARCH_MAX_RESULTS],
+        )
+    from .models import SearchTerm
+
+    for position, term in enumerate(terms):
+        if position == len(terms) - 1:
+            matching = SearchTerm.objects.filter(
+                term__gte=term, term__lt=term + '\uffff')
+        else:
+            matching = SearchTerm.objects.filter(term=term)
+        queryset = queryset.filter(
+            id__in=matching.values('post_id'))
+    return queryset
+
+
+def count_key(query):
+    """Ключ числа результатов; меняется вместе с главной лентой."""
+    versions = feed_cache.versions((counters.INDEX, None))
+    digest = hashlib.md5(f'{query}|{versions}'.encode()).hexdigest()
+    return counters.count_key(counters.SEARCH, digest)
+
+
+def index_posts(posts):
+    """Обновляет запасной индекс для постов; с FTS5 ничего не делает."""
+    posts = [post for post in posts if post.id is not None]
+    if has_fts() or not posts:
+        return
+    from .models import SearchTerm
+
+    with transaction.atomic():
+        SearchTerm.objects.filter(
+            post_id__in=[post.id for post in posts]).delete()
+        SearchTerm.objects.bulk_create([
+            SearchTerm(term=term, post_id=post.id)
+            for post in posts
+            for term in tokenize(post.text)
+        ])
+
+
+def index_post(post):
+    index_posts([post])
+
+
+def rebuild():
+    """Переиндексирует все посты."""
+    from .models import Post, SearchTerm
+
+    with connection.cursor() as cursor:
+        if install_fts(cursor):
+            has_fts.cache_clear()
+            return
+    with transaction.atomic():
+        SearchTerm.objects.all().delete()
+        batch = []
+        for post in Post.objects.only('id', 'text').iterator():
+            batch.append(post)
+            if len(batch) == 1000:
+                index_posts(batch)
+                batch = []
+        index_posts(batch)
@@ -0,0 +1,155 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, search, timeline
+from .decorators import forget_lookups
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_fields(sender, instance, raw, **kwargs):
+    instance._old_group_id = instance._old_author_id = None
+    if instance.pk is not None and not raw:
+        old = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'author_id').first()
+        )
+        if old is not None:
+            instance._old_group_id, instance._old_author_id = old
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    old_group_id = getattr(instance, '_old_group_id', None)
+    old_author_id = getattr(instance, '_old_author_id', None)
+    feeds = counters.post_feeds(
+        instance,
+        group_ids=() if old_group_id is None else (old_group_id,),
+        author_ids=() if old_author_id is None else (old_author_id,),
+    )
+    counters.invalidate(*(counters.count_key(*feed) for feed in feeds))
+    feed_cache.bump(*feeds)
+    forget_lookups(f'post:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    counters.invalidate(counters.following_key(instance.user_id))
+    # счётчики подписок видны в профилях обоих пользователей
+    feed_cache.bump(
+        (counters.FOLLOW, instance.user_id),
+        (counters.AUTHOR, instance.user_id),
+        (counters.AUTHOR, instance.author_id),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_page(sender, instance, **kwargs):
+    feed_cache.bump((counters.POST, instance.post_id))
+
+
+@receiver(pre_save, sender=Group)
+def forget_old_slug(sender, instance, raw, **kwargs):
+    # по старому slug группа больше не открывается
+    if instance.pk is not None and not raw:
+        forget_lookups(*(
+            f'group:{slug}' for slug in Group.objects.filter(
+                pk=instance.pk).values_list('slug', flat=True)
+        ))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    feed_cache.bump_all()
+    # группу могут удалить и создать заново с тем же slug
+    forget_lookups(f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_name(sender, instance, created, update_fields,
+                           **kwargs):
+    # вход пользователя обновляет только last_login, его в лентах не видно
+    if not created and update_fields != frozenset({'last_login'}):
+        feed_cache.bump_all()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_author(sender, instance, **kwargs):
+    feed_cache.bump_all()
+
+
+@receiver(pre_save, sender=User)
+def forget_old_username(sender, instance, raw, update_fields, **kwargs):
+    # вход сохраняет только last_login, имя при этом не меняется
+    if (instance.pk is None or raw
+            or (update_fields and 'username' not in update_fields)):
+        return
+    forget_lookups(*(
+        f'user:{username}' for username in User.objects.filter(
+            pk=instance.pk).values_list('username', flat=True)
+    ))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_lookup(sender, instance, **kwargs):
+    forget_lookups(f'user:{instance.username}')
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(author=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        AuthorStats.shift(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_moved_post(sender, instance, created, raw, **kwargs):
+    # админка позволяет передать пост другому автору
+    old_author_id = getattr(instance, '_old_author_id', None)
+    if created or raw or old_author_id in (None, instance.author_id):
+        return
+    AuthorStats.shift(old_author_id, posts_count=-1)
+    AuthorStats.shift(instance.author_id, posts_count=1)
+    timeline.move(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, raw, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    AuthorStats.shift(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        AuthorStats.shift(instance.author_id, followers_count=1)
+        AuthorStats.shift(instance.user_id, following_count=1)
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    AuthorStats.shift(instance.author_id, followers_count=-1)
+    AuthorStats.shift(instance.user_id, following_count=-1)
+    timeline.unfollow(instance.user_id, instance.author_id)
+
+
+def reinstall_search_triggers(sender, using, **kwargs):
+    """Миграции, пересоздающие posts_post на SQLite, теряют триггеры FTS5."""
+    search.ensure_fts(using)
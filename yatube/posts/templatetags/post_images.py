@@ -0,0 +1,18 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post):
+    """Миниатюра картинки поста или заглушка, пока она строится."""
+    image = thumbnails.ready(post.image)
+    if post.image and image is None:
+        thumbnails.schedule(post.image)
+    srcset = ', '.join(
+        f'{variant.url} {width}w'
+        for width, variant in thumbnails.variants(post.image)
+    ) if image is not None else ''
+    return {'post': post, 'image': image, 'srcset': srcset}
@@ -0,0 +1,106 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Max, Min
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..admin import IndexedDatesQuerySet
+from ..models import Group, Post
+from ..paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.group = Group.objects.create(title='Админка', slug='admin')
+        dates = [
+            datetime.datetime(2020, 12, 31, 23, 0),
+            datetime.datetime(2021, 1, 15, 12, 0),
+            datetime.datetime(2021, 1, 15, 18, 0),
+            datetime.datetime(2021, 3, 2, 8, 0),
+        ]
+        for number, date in enumerate(dates):
+            post = Post.objects.create(
+                text=f'Пост {number}', author=cls.admin,
+                group=cls.group if number % 2 else None,
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.make_aware(date))
+        cls.url = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_changelist_queries(self):
+        """Число запросов списка не растёт вместе с числом строк."""
+        self.client.get(self.url)
+        with self.assertNumQueries(4) as context:
+            self.client.get(self.url)
+        for query in context.captured_queries:
+            self.assertNotIn('DISTINCT', query['sql'])
+        for number in range(5):
+            Post.objects.create(text=f'Ещё {number}', author=self.admin,
+                                group=self.group)
+        self.client.get(self.url)
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+    def test_dates_match_queryset_dates(self):
+        """Даты date_hierarchy совпадают с QuerySet.dates() в обоих режимах."""
+        queryset = IndexedDatesQuerySet(Post)
+        for sample_size in (1000, 1):
+            with mock.patch.object(IndexedDatesQuerySet, 'SAMPLE_SIZE',
+                                   sample_size):
+                for kind in ('year', 'month', 'day'):
+                    with self.subTest(sample_size=sample_size, kind=kind):
+                        self.assertEqual(
+                            list(queryset.all().dates('pub_date', kind)),
+                            list(Post.objects.dates('pub_date', kind)),
+                        )
+                filtered = queryset.filter(group=self.group)
+                self.assertEqual(
+                    filtered.all().aggregate(first=Min('pub_date'),
+                                             last=Max('pub_date')),
+                    Post.objects.filter(group=self.group).aggregate(
+                        first=Min('pub_date'), last=Max('pub_date')),
+                )
+        self.assertEqual(IndexedDatesQuerySet(Post).none().dates(
+            'pub_date', 'year'), [])
+
+    def test_date_hierarchy(self):
+        response = self.client.get(self.url, {'pub_date__year': 2021})
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Пост 3', 'Пост 2', 'Пост 1'],
+        )
+        self.assertContains(response, 'pub_date__month=3')
+        self.assertNotContains(response, 'pub_date__month=2')
+
+    def test_estimated_count(self):
+        paginator = EstimatedCountPaginator(Post.objects.order_by('id'), 2)
+        self.assertEqual(paginator.count, 4)
+        with self.settings(ADMIN_COUNT_LIMIT=3):
+            paginator = EstimatedCountPaginator(
+                Post.objects.filter(text__startswith='Пост').order_by('id'), 2)
+            self.assertEqual(paginator.count, 3)
+            self.assertEqual(paginator.num_pages, 2)
+
+    def test_autocomplete(self):
+        response = self.client.get(reverse('admin:posts_post_add'))
+        self.assertContains(response, 'data-ajax--url', count=2)
+        response = self.client.get(
+            reverse('admin:posts_group_autocomplete'), {'term': 'Админ'})
+        self.assertEqual(
+            [result['text'] for result in response.json()['results']],
+            [str(self.group)],
+        )
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='api_author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(title='Проза', slug='prose')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                group=cls.group if i % 2 else None)
+            for i in range(15)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds(self):
+        """Ленты листаются курсором и совпадают с HTML-версией."""
+        cases = (
+            (self.client, reverse('api:posts'), 15),
+            (self.client,
+             reverse('api:group_posts', kwargs={'slug': self.group.slug}), 7),
+            (self.client,
+             reverse('api:profile',
+                     kwargs={'username': self.author.username}), 15),
+            (self.reader_client, reverse('api:follow_index'), 15),
+        )
+        for client, url, total in cases:
+            with self.subTest(url=url):
+                ids = []
+                params = {'limit': 4}
+                while True:
+                    data = client.get(url, params).json()
+                    ids.extend(post['id'] for post in data['results'])
+                    if data['next'] is None:
+                        break
+                    params['cursor'] = data['next']
+                self.assertEqual(len(ids), total)
+                self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_fields_and_detail(self):
+        post = self.posts[1]
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': post.id}),
+            {'fields': 'id,author_name,group'},
+        )
+        self.assertEqual(response.json(), {
+            'id': post.id, 'author_name': 'Лев Толстой', 'group': 'prose',
+        })
+        response = self.client.get(reverse('api:posts'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch(self):
+        """Пачка постов по id одним запросом и в порядке запроса."""
+        ids = [self.posts[3].id, 0, self.posts[0].id]
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('api:posts'),
+                {'ids': ','.join(map(str, ids)), 'fields': 'id,text'},
+            )
+        self.assertEqual(response.json()['results'], [
+            {'id': self.posts[3].id, 'text': 'Пост 3'},
+            {'id': self.posts[0].id, 'text': 'Пост 0'},
+        ])
+        response = self.client.get(reverse('api:posts'), {'ids': 'a,b'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_follow_requires_login(self):
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,67 @@
+import json
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+
+from .. import benchmark
+from ..models import AuthorStats, Comment, Follow, Post, User
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.created = benchmark.seed(posts=200, users=30, groups=3,
+                                     follows=4, comments=50)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed(self):
+        self.assertEqual(self.created['posts'], 200)
+        self.assertEqual(self.created['users'], 30)
+        self.assertEqual(self.created, benchmark.dataset())
+        self.assertTrue(benchmark.seeded())
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')).exists())
+        for stats in AuthorStats.objects.all():
+            self.assertEqual(
+                (stats.posts_count, stats.followers_count,
+                 stats.following_count),
+                (Post.objects.filter(author_id=stats.author_id).count(),
+                 Follow.objects.filter(author_id=stats.author_id).count(),
+                 Follow.objects.filter(user_id=stats.author_id).count()),
+            )
+        # у первого по рангу автора больше всего постов и подписчиков
+        top = User.objects.get(username=f'{benchmark.PREFIX}_0000000')
+        busiest = Post.objects.values('author').annotate(
+            total=Count('id')).order_by('-total').first()
+        self.assertEqual(busiest['author'], top.id)
+
+    def test_run(self):
+        comments = Comment.objects.count()
+        out = StringIO()
+        call_command('run_benchmark', '--requests', '3', '--warmup', '1',
+                     '--pages', '2', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['endpoints']), set(benchmark.ENDPOINTS))
+        for result in report['endpoints'].values():
+            self.assertEqual(result['requests'], 3)
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['queries']['max'], 0)
+            self.assertLessEqual(result['latency_ms']['p50'],
+                                 result['latency_ms']['p99'])
+        self.assertEqual(Comment.objects.count(), comments)
+
+    def test_plan_is_reproducible(self):
+        first, second = benchmark.Plan(seed=1), benchmark.Plan(seed=1)
+        for endpoint in benchmark.ENDPOINTS:
+            self.assertEqual(first.request(endpoint),
+                             second.request(endpoint))
+
+    def test_seed_twice(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark', stdout=StringIO())
@@ -0,0 +1,83 @@
+import csv
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.output_dir = tempfile.mkdtemp()
+        cls.author = User.objects.create_user(username='exporter')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Выгрузка', slug='export')
+        cls.old = Post.objects.create(text='Старый, "пост"',
+                                      author=cls.author, group=cls.group)
+        Post.objects.filter(pk=cls.old.pk).update(
+            pub_date=timezone.now() - datetime.timedelta(days=30))
+        cls.new = Post.objects.create(text='Новый пост', author=cls.author)
+        Comment.objects.create(post=cls.new, author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.output_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command('export_data', *args, stdout=out, stderr=StringIO(),
+                     **options)
+        return out.getvalue()
+
+    def test_ndjson(self):
+        rows = [json.loads(line)
+                for line in self.export('posts').splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [self.old.id, self.new.id])
+        self.assertEqual(rows[0]['group__slug'], 'export')
+        self.assertEqual(rows[0]['author__username'], 'exporter')
+        follows = self.export('follows').splitlines()
+        self.assertEqual(json.loads(follows[0])['user__username'], 'reader')
+
+    def test_since(self):
+        since = (timezone.now() - datetime.timedelta(days=1)).date()
+        rows = self.export('posts', since=since.isoformat()).splitlines()
+        self.assertEqual([json.loads(row)['id'] for row in rows],
+                         [self.new.id])
+
+    def test_gzip_csv_file(self):
+        path = os.path.join(self.output_dir, 'comments.csv.gz')
+        self.export('posts', format='csv', gzip=True, output=path)
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(rows[0]['text'], 'Старый, "пост"')
+        self.assertEqual(len(rows), 2)
+
+    def test_admin_action(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {'action': 'export_ndjson', '_selected_action': [self.new.id]},
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         [self.new.id])
@@ -1,57 +1,38 @@
 import datetime
 from http import HTTPStatus
-import tempfile
-import shutil
+from io import BytesIO
 
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from django.conf import settings
+from PIL import Image
 
+from core.testing import TemporaryMediaMixin, small_gif
+
+from ..forms import PostForm
 from ..models import Group, Post
 
 User = get_user_model()
-MEDIA_ROOT_TEMP = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=MEDIA_ROOT_TEMP)
-class PostCreateFormTests(TestCase):
+class PostCreateFormTests(TemporaryMediaMixin, TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='test_user')
         cls.group = Group.objects.create(title='test_group', slug='test_slug')
         cls.text = "test text"
+        cls.post = Post.objects.create(
+            text=cls.text,
+            pub_date=datetime.datetime.today().strftime("%m-%d-%Y"),
+            author=cls.user,
+            group=cls.group,
+            image=small_gif(),
+        )
 
     def setUp(self) -> None:
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
-        self.small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x02\x00'
-            b'\x01\x00\x80\x00\x00\x00\x00\x00'
-            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-            b'\x0A\x00\x3B'
-        )
-        self.image_for_new_post = SimpleUploadedFile(
-            name='small.gif',
-            content=self.small_gif,
-            content_type='image/gif'
-        )
-        self.post = Post.objects.create(
-            text=self.text,
-            pub_date=datetime.datetime.today().strftime("%m-%d-%Y"),
-            author=self.user,
-            group=self.group,
-            image=self.image_for_new_post,
-        )
-
-    @classmethod
-    def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
-        super().tearDownClass()
 
     def test_new_post_added(self):
         """ проверка создания нового поста """
@@ -122,7 +103,7 @@ class PostCreateFormTests(TestCase):
         forms = {
             'text': PostCreateFormTests.text,
             'group': self.group.id,
-            'image': self.image_for_new_post.name,
+            'image': small_gif(),
         }
         self.authorized_client.post(reverse('posts:post_create'),
                                     data=forms,
@@ -130,3 +111,58 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count + 1)
         self.assertTrue(Post.objects.filter(text='test text')
                         .exists())
+
+
+class ImageNormalizationTests(TestCase):
+    @staticmethod
+    def upload(name, mode, size, image_format, **params):
+        buffer = BytesIO()
+        Image.new(mode, size, 'red').save(buffer, image_format, **params)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def clean(self, upload):
+        form = PostForm(data={'text': 'текст'}, files={'image': upload})
+        form.is_valid()
+        return form
+
+    def test_large_photo_downscaled_and_stripped(self):
+        """Большое фото уменьшается, поворачивается и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        exif[0x010F] = 'Camera'
+        form = self.clean(self.upload('photo.jpeg', 'RGB', (3000, 1000),
+                                      'JPEG', exif=exif.tobytes()))
+        image_file = form.cleaned_data['image']
+        self.assertEqual(image_file.name, 'photo.jpg')
+        image = Image.open(image_file)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (640, 1920))
+        self.assertFalse(image.getexif())
+
+    def test_transparent_image_kept_as_png(self):
+        form = self.clean(self.upload('logo.gif', 'RGBA', (10, 10), 'PNG'))
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.mode, 'RGBA')
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_decompression_bomb_rejected(self):
+        form = self.clean(self.upload('bomb.png', 'RGB', (20, 20), 'PNG'))
+        self.assertIn('image', form.errors)
+
+    def test_truncated_image_rejected(self):
+        """Обрезанный файл — ошибка формы, а не 500."""
+        buffer = BytesIO()
+        Image.effect_noise((300, 300), 64).convert('RGB').save(buffer, 'JPEG')
+        content = buffer.getvalue()[:len(buffer.getvalue()) // 2]
+        form = self.clean(SimpleUploadedFile('cut.jpg', content))
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'invalid_image')
+        client = Client()
+        client.force_login(User.objects.create_user(username='cutter'))
+        response = client.post(reverse('posts:post_create'), {
+            'text': 'Битая картинка',
+            'image': SimpleUploadedFile('cut.jpg', content, 'image/jpeg'),
+        })
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse(Post.objects.filter(text='Битая картинка').exists())
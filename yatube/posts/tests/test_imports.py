@@ -0,0 +1,107 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import AuthorStats, Comment, Group, Post
+
+User = get_user_model()
+
+
+class ImportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.input_dir = tempfile.mkdtemp()
+        cls.author = User.objects.create_user(username='importer')
+        cls.group = Group.objects.create(title='Импорт', slug='import')
+        cls.post = Post.objects.create(text='Уже есть', author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.input_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, name, rows):
+        path = os.path.join(self.input_dir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return path
+
+    def load(self, *args):
+        out = StringIO()
+        call_command('import_data', *args, batch_size=2, stdout=out)
+        return out.getvalue()
+
+    def test_import_posts(self):
+        """Посты вставляются пачками с датами из файла и без сигналов."""
+        pub_date = timezone.now() - datetime.timedelta(days=400)
+        self.client.get(reverse('posts:index'))
+        path = self.write('posts.ndjson', [
+            {'text': f'Импорт {i}', 'author__username': 'importer',
+             'group__slug': 'import', 'pub_date': pub_date.isoformat()}
+            for i in range(5)
+        ] + [
+            {'text': 'Без автора', 'author': 'nobody'},
+            {'text': 'Чужая группа', 'author': 'importer', 'group': 'none'},
+        ])
+        self.assertIn('Загружено: 5, пропущено: 2', self.load('posts', path))
+        imported = Post.objects.filter(group=self.group)
+        self.assertEqual(imported.count(), 5)
+        self.assertEqual(imported.first().pub_date, pub_date)
+        self.assertEqual(AuthorStats.for_author(self.author).posts_count, 6)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 6)
+
+    def test_import_dates(self):
+        """Дата без времени — полночь, несуществующая дата пропускает
+        строку, а не роняет загрузку."""
+        path = self.write('dates.ndjson', [
+            {'text': 'Только дата', 'author': 'importer',
+             'pub_date': '2019-05-04'},
+            {'text': 'Нет такого дня', 'author': 'importer',
+             'pub_date': '2019-02-30T10:00:00'},
+            {'text': 'Нет такого дня', 'author': 'importer',
+             'pub_date': '2019-02-30'},
+            {'text': 'Не дата', 'author': 'importer', 'pub_date': 'вчера'},
+        ])
+        self.assertIn('Загружено: 1, пропущено: 3', self.load('posts', path))
+        post = Post.objects.get(text='Только дата')
+        self.assertEqual(timezone.localtime(post.pub_date).date(),
+                         datetime.date(2019, 5, 4))
+        self.assertEqual(timezone.localtime(post.pub_date).hour, 0)
+
+    def test_import_comments(self):
+        path = self.write('comments.ndjson', [
+            {'post_id': self.post.id, 'author': 'importer', 'text': 'Да'},
+            {'post_id': 0, 'author': 'importer', 'text': 'Нет поста'},
+            {'post_id': 'abc', 'author': 'importer', 'text': 'Не число'},
+            {'author': 'importer', 'text': 'Без поста'},
+            {'post_id': self.post.id, 'author': 'importer', 'text': 'Когда',
+             'created': '2019-13-01'},
+        ])
+        self.assertIn('Загружено: 1, пропущено: 4',
+                      self.load('comments', path))
+        self.assertEqual(Comment.objects.get().post, self.post)
+
+    def test_export_roundtrip(self):
+        """Выгрузка export_data загружается обратно без правок."""
+        path = os.path.join(self.input_dir, 'posts.csv.gz')
+        call_command('export_data', 'posts', format='csv', gzip=True,
+                     output=path, stderr=StringIO())
+        self.load('posts', path)
+        texts = list(Post.objects.values_list('text', flat=True))
+        self.assertEqual(texts, ['Уже есть', 'Уже есть'])
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-from ..models import Post, Group
+from ..models import AuthorStats, Follow, Group, Post, TimelineEntry
 
 User = get_user_model()
 
@@ -40,3 +42,57 @@ class GroupModelTest(TestCase):
     def test_group_name_is_title_field(self):
         expected_object_name = GroupModelTest.group_name.title
         self.assertEqual(expected_object_name, str(GroupModelTest.group_name))
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='stats_author')
+        cls.reader = User.objects.create_user(username='stats_reader')
+
+    def test_counters_follow_posts_and_subscriptions(self):
+        post = Post.objects.create(text='Первый', author=self.author)
+        Post.objects.create(text='Второй', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        stats = AuthorStats.for_author(self.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(AuthorStats.for_author(self.reader).following_count,
+                         1)
+        post.delete()
+        follow.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(AuthorStats.for_author(self.reader).following_count,
+                         0)
+
+    def test_missing_row_is_recounted(self):
+        Post.objects.create(text='Пост', author=self.author)
+        AuthorStats.objects.filter(author=self.author).delete()
+        self.assertEqual(AuthorStats.for_author(self.author).posts_count, 1)
+
+    def test_post_moved_to_other_author(self):
+        """Смена автора переносит пост в счётчики и ленты нового автора."""
+        cache.clear()
+        post = Post.objects.create(text='Чужой пост', author=self.author)
+        Post.objects.create(text='Свой пост', author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        urls = [reverse('posts:profile', kwargs={'username': user.username})
+                for user in (self.author, self.reader)]
+        for url in urls:
+            self.client.get(url)
+        post.author = self.reader
+        post.save()
+        self.assertEqual(AuthorStats.for_author(self.author).posts_count, 1)
+        self.assertEqual(AuthorStats.for_author(self.reader).posts_count, 1)
+        self.assertNotContains(self.client.get(urls[0]), 'Чужой пост')
+        self.assertContains(self.client.get(urls[1]), 'Чужой пост')
+        with self.settings(FOLLOW_TIMELINE=True):
+            post.author = self.author
+            post.save()
+            self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+            post.author = self.reader
+            post.save()
+        self.assertTrue(TimelineEntry.objects.filter(
+            post=post, user=self.author).exists())
@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters, feed_cache
+from ..models import Group, Post
+from ..paginators import CursorPaginator, page_position
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cursor_author')
+        cls.group = Group.objects.create(title='Курсоры', slug='cursor')
+        # одинаковое время публикации проверяет разбор ничьих по id
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                group=cls.group)
+            for i in range(23)
+        ]
+        Post.objects.filter(
+            id__in=[post.id for post in posts if post.id % 2]
+        ).update(pub_date=posts[0].pub_date)
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True)
+        )
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), 10)
+
+    def test_walk_forward_and_back(self):
+        """Проход вперёд и назад по курсорам не теряет и не дублирует."""
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [10, 10, 3])
+        self.assertFalse(pages[0].has_previous())
+        walked = [post.id for page in pages for post in page]
+        self.assertEqual(walked, self.expected)
+
+        back = self.paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([post.id for post in back], self.expected[10:20])
+        self.assertTrue(back.has_next())
+        first = self.paginator.get_page(back.previous_cursor)
+        self.assertEqual([post.id for post in first], self.expected[:10])
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        for cursor in ('garbage', 'W10', 'WyJ4IiwiMSIsIjIiXQ'):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual([post.id for post in page],
+                                 self.expected[:10])
+
+    @override_settings(FEED_PAGINATION='cursor')
+    def test_feed_views_use_cursor(self):
+        """Ленты в режиме cursor отдают ссылки ?cursor= вместо номеров."""
+        client = Client()
+        client.force_login(self.author)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                response = client.get(url)
+                page_obj = response.context['page_obj']
+                self.assertTrue(page_obj.is_cursor)
+                self.assertContains(response,
+                                    f'?cursor={page_obj.next_cursor}')
+                self.assertNotContains(response, '?page=')
+                response = client.get(f'{url}?cursor={page_obj.next_cursor}')
+                self.assertEqual(
+                    [post.id for post in response.context['page_obj']],
+                    self.expected[10:20],
+                )
+
+
+class CachedCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='count_author')
+        cls.group = Group.objects.create(title='Счётчик', slug='count')
+        for i in range(12):
+            Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                group=cls.group)
+        cls.url = reverse('posts:group_posts',
+                          kwargs={'slug': cls.group.slug})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached_between_requests(self):
+        """Повторный показ ленты не выполняет COUNT(*)."""
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url)
+        # сбрасываем только кэш страницы, счётчик остаётся
+        feed_cache.bump((counters.GROUP, self.group.id))
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(self.url)
+        self.assertTrue(
+            any('COUNT(' in query['sql'] for query in first.captured_queries)
+        )
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in second.captured_queries)
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+
+    def test_count_invalidated_on_post_changes(self):
+        self.client.get(self.url)
+        post = Post.objects.create(text='Новый', author=self.author,
+                                   group=self.group)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        post.group = None
+        post.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        Post.objects.filter(group=self.group).first().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 11)
+
+    def test_page_position(self):
+        """Ключ фрагмента — страница, которую действительно покажут."""
+        posts = Post.objects.filter(group=self.group)
+        count_key = counters.count_key(counters.GROUP, self.group.id)
+
+        def position(**params):
+            request = RequestFactory().get(self.url, params)
+            return page_position(request, posts, count_key=count_key)
+
+        self.assertEqual(position(), '1')
+        self.assertEqual(position(page='мусор'), '1')
+        self.assertEqual(position(page='02'), '2')
+        # пока число постов неизвестно, номер не ограничивается
+        self.assertEqual(position(page='99'), '99')
+        self.assertEqual(position(page='0'), 'last')
+        self.client.get(self.url)
+        self.assertEqual(position(page='99'), '2')
+        self.assertEqual(position(page='-1'), '2')
+        with self.settings(FEED_PAGINATION='cursor'):
+            cursor = CursorPaginator(posts, 10).page().next_cursor
+            self.assertEqual(position(cursor=cursor), cursor)
+            self.assertEqual(position(cursor='мусор'), '1')
+            self.assertEqual(position(page='2'), '1')
+
+
+class PageWindowTest(TestCase):
+    def render(self, number, pages=1000):
+        page_obj = Paginator(range(pages * 10), 10).page(number)
+        return render_to_string('includes/paginator.html',
+                                {'page_obj': page_obj})
+
+    def test_only_pages_around_current_are_listed(self):
+        html = self.render(500)
+        for number in (1, 498, 499, 501, 502, 1000):
+            self.assertIn(f'?page={number}"', html)
+        for number in (2, 497, 503, 999):
+            self.assertNotIn(f'?page={number}"', html)
+        self.assertIn('<span class="page-link">500</span>', html)
+
+    def test_window_is_clipped_at_edges(self):
+        html = self.render(1, pages=3)
+        self.assertIn('?page=2"', html)
+        self.assertIn('?page=3"', html)
+        self.assertNotIn('?page=4"', html)
+        self.assertNotIn('?page=0"', html)
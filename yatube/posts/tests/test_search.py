@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_migrate
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, SearchTerm
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='searcher')
+        cls.cat = Post.objects.create(text='Кошки любят молоко',
+                                      author=cls.author)
+        cls.dog = Post.objects.create(text='Собаки любят кости',
+                                      author=cls.author)
+        cls.url = reverse('posts:search')
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, query):
+        return list(search.search(Post.objects.order_by('id'), query))
+
+    def test_fts_backend(self):
+        """На SQLite поиск идёт через FTS5 и видит любые изменения."""
+        self.assertTrue(search.has_fts())
+        self.assertEqual(self.found('любят'), [self.cat, self.dog])
+        self.assertEqual(self.found('кошки любят'), [self.cat])
+        self.assertEqual(self.found('мол'), [self.cat])
+        self.assertEqual(self.found('!!!'), [])
+        with self.settings(SEARCH_MAX_RESULTS=1):
+            self.assertEqual(self.found('любят'), [self.dog])
+        Post.objects.filter(pk=self.dog.pk).update(text='Собаки грызут')
+        self.assertEqual(self.found('любят'), [self.cat])
+        Post.objects.bulk_create([Post(text='Любят все', author=self.author)])
+        self.assertEqual(len(self.found('любят')), 2)
+        Post.objects.filter(pk=self.cat.pk).delete()
+        self.assertEqual([post.text for post in self.found('любят')],
+                         ['Любят все'])
+
+    def test_triggers_restored_after_migrate(self):
+        """Пропавшие после миграции триггеры ставятся заново."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.FTS_TABLE}_insert')
+        Post.objects.create(text='Пропущенный пост', author=self.author)
+        self.assertEqual(self.found('пропущенный'), [])
+        post_migrate.send(sender=apps.get_app_config('posts'),
+                          app_config=apps.get_app_config('posts'),
+                          verbosity=0, interactive=False,
+                          using=connection.alias, apps=apps, plan=[])
+        self.assertEqual(len(self.found('пропущенный')), 1)
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(len(self.found('новый')), 1)
+        self.assertFalse(search.ensure_fts())
+
+    def test_terms_backend(self):
+        """Без FTS5 работает обратный индекс, его обновляют сигналы."""
+        with mock.patch.object(search, 'has_fts', return_value=False):
+            search.index_posts(Post.objects.all())
+            self.assertEqual(self.found('любят'), [self.cat, self.dog])
+            self.assertEqual(self.found('кошки мол'), [self.cat])
+            dog = Post.objects.get(pk=self.dog.pk)
+            dog.text = 'Собаки грызут'
+            dog.save()
+            self.assertEqual(self.found('любят'), [self.cat])
+            self.assertEqual(self.found('грыз'), [self.dog])
+        self.assertTrue(SearchTerm.objects.filter(term='грызут').exists())
+
+    def test_search_page(self):
+        """Страница поиска листается и не теряет запрос в ссылках."""
+        for i in range(settings.COUNT_PAGES + 1):
+            Post.objects.create(text=f'Поиск {i}', author=self.author)
+        response = self.client.get(self.url, {'q': 'поиск'})
+        self.assertEqual(len(response.context['page_obj']),
+                         settings.COUNT_PAGES)
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D0%B8%D1%81%D0%BA'
+                                      '&amp;page=2')
+        response = self.client.get(self.url, {'q': 'поиск', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 1)
+        response = self.client.get(self.url, {'q': 'молоко'})
+        self.assertEqual(list(response.context['page_obj']), [self.cat])
+        self.assertIsNone(self.client.get(self.url).context['page_obj'])
+
+    def test_admin_search(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:posts_post_changelist'),
+                                   {'q': 'кости'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.dog])
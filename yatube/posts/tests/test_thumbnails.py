@@ -0,0 +1,78 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from core.testing import TemporaryMediaMixin, small_gif
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+
+class ThumbnailsTest(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='painter')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=small_gif('thumb.gif'),
+        )
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear()
+
+    def test_placeholder_until_ready(self):
+        """Лента не режет картинку в запросе, а показывает заглушку."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertIsNone(thumbnails.ready(self.post.image))
+        thumbnails.generate(self.post.image.name)
+        image = thumbnails.ready(self.post.image)
+        self.assertIsNotNone(image)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, image.url)
+        self.assertNotContains(response, 'aspect-ratio: 960 / 339')
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_generate_without_workers(self):
+        """Без пула потоков миниатюра строится сразу."""
+        thumbnails._submit(self.post.image.name)
+        self.assertIsNotNone(thumbnails.ready(self.post.image))
+        self.assertNotIn(self.post.image.name, thumbnails._pending)
+
+    def test_responsive_variants(self):
+        """Готовая картинка отдаётся с WebP-вариантами разной ширины."""
+        thumbnails.generate(self.post.image.name)
+        variants = thumbnails.variants(self.post.image)
+        self.assertEqual([width for width, _ in variants],
+                         list(thumbnails.VARIANT_WIDTHS))
+        for width, variant in variants:
+            with self.subTest(width=width):
+                self.assertTrue(variant.name.endswith('.webp'))
+                self.assertEqual(variant.width, width)
+        response = self.client.get(reverse('posts:post_detail',
+                                           kwargs={'post_id': self.post.id}))
+        self.assertContains(response, 'type="image/webp"')
+        for width, variant in variants:
+            self.assertContains(response, f'{variant.url} {width}w')
+
+    def test_warm_thumbnails_command(self):
+        """Команда строит недостающие миниатюры, dry-run только считает."""
+        out = StringIO()
+        call_command('warm_thumbnails', dry_run=True, stdout=out)
+        self.assertIn('для 1 картинок', out.getvalue())
+        self.assertFalse(thumbnails.is_warm(self.post.image))
+        call_command('warm_thumbnails', workers=0, stdout=StringIO())
+        self.assertTrue(thumbnails.is_warm(self.post.image))
+        out = StringIO()
+        call_command('warm_thumbnails', workers=0,
+                     start_after=self.post.id, stdout=out)
+        self.assertIn('Построено миниатюр: 0', out.getvalue())
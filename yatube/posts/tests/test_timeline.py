@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import cache_writes
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_TIMELINE=True, TIMELINE_FANOUT_LIMIT=1)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        cls.fan = User.objects.create_user(username='fan')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_fan_out_on_write(self):
+        """Пост автора сразу попадает в материализованную ленту."""
+        Post.objects.create(text='до подписки', author=self.author)
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': self.author.username}))
+        Post.objects.create(text='после подписки', author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(self.feed(), ['после подписки', 'до подписки'])
+
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': self.author.username}))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.feed(), [])
+
+    def test_prolific_author_pulled_on_read(self):
+        """Посты популярного автора подтягиваются при чтении ленты."""
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='звезда', author=self.star)
+        Post.objects.create(text='автор', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(author=self.star))
+        self.assertEqual(self.feed(), ['автор', 'звезда'])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, author=self.star)
+        )
+
+    def test_pull_only_when_fragment_rendered(self):
+        """Закэшированная лента не подтягивает посты при каждом запросе."""
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        self.feed()
+        with mock.patch.object(timeline, 'pull') as pull:
+            self.client.get(reverse('posts:follow_index'))
+        pull.assert_not_called()
+        Post.objects.create(text='новая звезда', author=self.star)
+        self.assertEqual(self.feed(), ['новая звезда'])
+
+    def test_prolific_post_skips_follower_keys(self):
+        """Пост автора выше TIMELINE_FANOUT_LIMIT не трогает ключи кэша
+        каждого подписчика: лента читателя узнаёт о нём по поколению
+        автора."""
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        self.feed()
+        with cache_writes() as writes:
+            Post.objects.create(text='звезда', author=self.star)
+        follower_keys = [key for key in writes
+                         if key.startswith(('feed_version:follow:',
+                                            'feed_count:follow:',
+                                            'following:'))]
+        self.assertEqual(follower_keys, [])
+        self.assertEqual(self.feed(), ['звезда'])
+
+    def test_matches_join_feed(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(12):
+            Post.objects.create(text=f'пост {i}', author=self.author)
+        timeline_feed = self.feed()
+        with override_settings(FOLLOW_TIMELINE=False):
+            cache.clear()
+            self.assertEqual(self.feed(), timeline_feed)
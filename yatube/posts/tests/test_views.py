@@ -1,6 +1,4 @@
 import http
-import shutil
-import tempfile
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
@@ -10,16 +8,16 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from django import forms
 
-from ..models import Post, Group, Follow
+from core.testing import TemporaryMediaMixin, cache_writes
+
+from ..models import Comment, Post, Group, Follow
 
 User = get_user_model()
 
 
 class ViewsTests(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
-        cls.guest_client = Client()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='test_user')
         cls.group = Group.objects.create(
             title='test title',
@@ -40,6 +38,7 @@ class ViewsTests(TestCase):
         }
 
     def setUp(self):
+        self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         cache.clear()
@@ -145,14 +144,13 @@ class ViewsTests(TestCase):
         self.assertEqual(post.group, self.group)
         self.assertEqual(post.author.username, self.user.username)
         page_bytes = response.content
+        with self.assertNumQueries(0):
+            response1 = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(page_bytes, response1.content)
         Post.objects.get(pk=post3.id).delete()
-        response1 = self.guest_client.get(reverse('posts:index'))
-        page_bytes2 = response1.content
-        self.assertEqual(page_bytes, page_bytes2)
-        cache.clear()
         response2 = self.guest_client.get(reverse('posts:index'))
-        page_bytes2 = response2.content
-        self.assertNotEqual(page_bytes, page_bytes2)
+        self.assertNotEqual(page_bytes, response2.content)
+        self.assertNotContains(response2, 'Тестовый пост')
 
     def test_new_post_follower(self):
         """ Новая запись пользователя появляется в ленте подписчиков """
@@ -179,8 +177,7 @@ class ViewsTests(TestCase):
 
 class TestFollow(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='TestAuthor')
         cls.group = Group.objects.create(title='TestGroup',
                                          slug='test_slug',
@@ -239,8 +236,7 @@ class TestFollow(TestCase):
 
 class TestComments(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='TestUser')
         cls.comment_user = User.objects.create_user(username='TestCommentUser')
         cls.post = Post.objects.create(text='Test text', author=cls.user)
@@ -263,11 +259,38 @@ class TestComments(TestCase):
         }, follow=True)
         self.assertContains(response, 'test comment')
 
+    def test_comments_paginated(self):
+        """Комментарии выводятся страницами, остальные — по курсору."""
+        per_page = settings.COMMENTS_PER_PAGE
+        for i in range(per_page + 5):
+            Comment.objects.create(post=self.post, author=self.comment_user,
+                                   text=f'Комментарий {i}')
+        response = self.authorized_user.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), per_page)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        with self.assertNumQueries(4):
+            response = self.authorized_user.get(
+                url, {'cursor': comments.next_cursor})
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertContains(response, f'Комментарий {per_page + 4}')
+        self.assertNotContains(response, 'Показать ещё')
+        response = self.anonymous.get(url, {'format': 'json',
+                                            'order': 'new'})
+        data = response.json()
+        self.assertEqual(len(data['comments']), per_page)
+        self.assertEqual(data['comments'][0]['text'],
+                         f'Комментарий {per_page + 4}')
+        self.assertEqual(data['comments'][0]['author'],
+                         self.comment_user.username)
+        self.assertIsNotNone(data['next'])
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
+    def setUpTestData(cls):
         cls.author = User.objects.create_user(username='noauthor')
         cls.group = Group.objects.create(
             title='Тестовая',
@@ -321,15 +344,10 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(len(response.context['page_obj']), 3)
 
 
-class PostImageTest(TestCase):
+class PostImageTest(TemporaryMediaMixin, TestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
-        cache.clear()
+    def setUpTestData(cls):
         cls.user = User.objects.create_user(username='test_bob')
-        cls.authorized_client = Client()
-        cls.authorized_client.force_login(cls.user)
         cls.group = Group.objects.create(
             title='Cats',
             slug='group_cats',
@@ -355,10 +373,8 @@ class PostImageTest(TestCase):
             image=uploaded,
         )
 
-    @classmethod
-    def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
-        super().tearDownClass()
+    def setUp(self):
+        cache.clear()
 
     def test_index_page_shows_correct_context(self):
         response = self.client.get(reverse('posts:index'))
@@ -384,3 +400,281 @@ class PostImageTest(TestCase):
         }))
         self.assertEqual(response.context.get('post').image,
                          self.post.image)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Лента', slug='feed')
+        for i in range(settings.COUNT_PAGES):
+            author = User.objects.create_user(
+                username=f'author{i}', first_name='Имя', last_name=str(i)
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+            Post.objects.create(text=f'Пост {i}', author=author,
+                                group=cls.group)
+        cls.author = author
+        for i in range(settings.COUNT_PAGES):
+            Post.objects.create(text=f'Ещё пост {i}', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def test_feed_query_count(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        # профиль: автор + его счётчики + страница постов
+        # подписки: сессия + пользователь + список авторов (кэшируется)
+        # + COUNT(*) + страница постов
+        # гостю кэш страниц добавляет поиск объекта и MAX(pub_date);
+        # найденные группа и автор дальше берутся из кэша
+        cases = (
+            (self.guest_client, reverse('posts:index'), 3),
+            (self.guest_client,
+             reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+             4),
+            (self.guest_client,
+             reverse('posts:profile',
+                     kwargs={'username': self.author.username}),
+             4),
+            (self.authorized_client, reverse('posts:follow_index'), 5),
+        )
+        for client, url, queries in cases:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = client.get(url)
+                self.assertEqual(len(response.context['page_obj']),
+                                 settings.COUNT_PAGES)
+
+    def test_fragment_hit_queries(self):
+        """С готовым фрагментом ленты остаются только сессия и
+        пользователь."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.authorized_client.get(url)
+                with self.assertNumQueries(2):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='cached_author')
+        cls.group = Group.objects.create(title='Кэш', slug='cached')
+        cls.post = Post.objects.create(text='Кэшированный пост',
+                                       author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_fresh_after_changes(self):
+        """Изменения постов, групп и авторов сразу видны в лентах."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+        for url in urls:
+            self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='не виден')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url),
+                                    'Кэшированный пост')
+        # свежие копии: объекты из setUpTestData общие для всех тестов
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое'
+        author.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        urls = urls[:1] + (
+            reverse('posts:group_posts', kwargs={'slug': 'renamed'}),
+        ) + urls[2:]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Исправленный пост')
+                if url != urls[1]:
+                    self.assertContains(response, '/group/renamed/')
+        self.assertContains(self.client.get(urls[0]), 'Новое')
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='page_author')
+        cls.reader = User.objects.create_user(username='page_reader')
+        cls.group = Group.objects.create(title='Страницы', slug='pages')
+        cls.post = Post.objects.create(text='Пост для гостей',
+                                       author=cls.author, group=cls.group)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': cls.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_not_modified(self):
+        """Гость с актуальным ETag или датой получает 304 без запросов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+                with self.assertNumQueries(0):
+                    cached = self.client.get(url)
+                    not_modified = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                    since = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(cached.content, response.content)
+                self.assertEqual(not_modified.status_code,
+                                 http.HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(since.status_code,
+                                 http.HTTPStatus.NOT_MODIFIED)
+
+    def test_fresh_after_changes(self):
+        """Новый пост, комментарий и подписка меняют ETag страниц."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(text='Свежий пост', author=self.author,
+                            group=self.group)
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertContains(response, 'Свежий пост')
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Свежий комментарий')
+        self.assertContains(self.client.get(self.urls[3]),
+                            'Свежий комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.client.get(self.urls[2]).context['stats'].followers_count, 1
+        )
+
+    def test_recreated_objects(self):
+        """Группа и автор, созданные заново под тем же именем, не
+        наследуют кэш удалённых."""
+        group_url, profile_url = self.urls[1:3]
+        for url in (group_url, profile_url):
+            self.client.get(url)
+        Group.objects.filter(pk=self.group.pk).delete()
+        group = Group.objects.create(title='Новые', slug=self.group.slug)
+        User.objects.filter(pk=self.author.pk).delete()
+        author = User.objects.create_user(username=self.author.username)
+        self.client.get(group_url)
+        self.client.get(profile_url)
+        Post.objects.create(text='Пост новой группы', author=author,
+                            group=group)
+        self.assertContains(self.client.get(group_url), 'Пост новой группы')
+        self.assertContains(self.client.get(profile_url),
+                            'Пост новой группы')
+
+    def test_unread_params_share_cache(self):
+        """Параметры, которые view не читает, не создают новую страницу."""
+        url = self.urls[0]
+        response = self.client.get(url, {'page': 1})
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, {'page': 1, 'utm_source': 'x'})
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertNotEqual(self.client.get(url, {'page': 2})['ETag'],
+                            response['ETag'])
+
+    def test_renamed_objects(self):
+        """По старым slug и имени переименованные группа и автор не
+        открываются."""
+        group_url, profile_url = self.urls[1:3]
+        for url in (group_url, profile_url):
+            self.client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'pages-renamed'
+        group.save()
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'page_author_renamed'
+        author.save()
+        for url in (group_url, profile_url):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code,
+                                 http.HTTPStatus.NOT_FOUND)
+
+    def test_comment_order_not_shared(self):
+        """Порядок комментариев входит в ключ закэшированной страницы."""
+        for number in range(settings.COMMENTS_PER_PAGE + 1):
+            Comment.objects.create(post=self.post, author=self.reader,
+                                   text=f'Комментарий {number}')
+        url = self.urls[3]
+        old = self.client.get(url).context['comments']
+        new = self.client.get(url, {'order': 'new'}).context['comments']
+        self.assertEqual(old[0].text, 'Комментарий 0')
+        self.assertEqual(new[0].text,
+                         f'Комментарий {settings.COMMENTS_PER_PAGE}')
+
+    def test_authorized_not_cached(self):
+        """Авторизованные пользователи получают страницу без кэша."""
+        client = Client()
+        client.force_login(self.reader)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertNotIn('ETag', response)
+                self.assertIsNotNone(response.context)
+
+
+class FollowFeedCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='popular')
+        cls.readers = [User.objects.create_user(username=f'reader{i}')
+                       for i in range(30)]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+        cls.lonely = User.objects.create_user(username='lonely')
+        Follow.objects.create(user=cls.readers[0], author=cls.lonely)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.readers[0])
+
+    def test_post_save_writes_do_not_grow_with_followers(self):
+        """Пост автора с подписчиками стоит столько же записей в кэш,
+        сколько пост автора с одним подписчиком."""
+        # общие ключи (главная лента и т. п.) создаются первой записью
+        Post.objects.create(text='Разогрев', author=self.readers[1])
+        counts = []
+        for author in (self.author, self.lonely):
+            with cache_writes() as writes:
+                post = Post.objects.create(text='Пост', author=author)
+                post.text = 'Правка'
+                post.save()
+                post.delete()
+            counts.append(len(writes))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_follow_feed_fresh_after_post(self):
+        url = reverse('posts:follow_index')
+        self.assertNotContains(self.client.get(url), 'Свежий пост')
+        Post.objects.create(text='Свежий пост', author=self.author)
+        self.assertContains(self.client.get(url), 'Свежий пост')
+        Follow.objects.filter(user=self.readers[0],
+                              author=self.author).delete()
+        self.assertNotContains(self.client.get(url), 'Свежий пост')
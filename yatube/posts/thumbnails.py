@@ -0,0 +1,154 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Шаблоны не режут картинки сами: они берут готовую миниатюру из
+key-value хранилища sorl-thumbnail, а пока её нет, показывают заглушку.
+Миниатюры строит пул потоков после коммита транзакции, в которой
+сохранён пост; когда миниатюра готова, ленты с этим постом
+получают новое поколение и перерисовываются.
+
+Кроме основной JPEG-миниатюры строятся WebP-варианты нескольких
+ширин с теми же пропорциями: шаблон отдаёт их через srcset, и браузер
+на узком экране скачивает самый маленький.
+"""
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import counters, feed_cache
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+VARIANT_WIDTHS = (320, 640, 960)
+VARIANT_OPTIONS = {**OPTIONS, 'format': 'WEBP', 'quality': 80}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Бэкенд, который умеет только искать уже готовые миниатюры."""
+
+    def get_ready(self, file_, geometry_string, **options):
+        thumbnail = self.thumbnail_file(
+            str(file_), geometry_string, tuple(sorted(options.items()))
+        )
+        return default.kvstore.get(thumbnail)
+
+    @functools.lru_cache(maxsize=4096)
+    def thumbnail_file(self, file_, geometry_string, options):
+        """Файл миниатюры, под которым sorl записал её в хранилище."""
+        source = ImageFile(file_)
+        options = dict(options)
+        # опции дополняются так же, как в ThumbnailBackend.get_thumbnail,
+        # иначе имя миниатюры не совпадёт с записанным
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = ReadyThumbnailBackend()
+
+
+def ready(image):
+    """Готовая миниатюра картинки или None, если её ещё нет."""
+    if not image:
+        return None
+    return backend.get_ready(image, GEOMETRY, **OPTIONS)
+
+
+def variant_geometry(width):
+    width_, height = map(int, GEOMETRY.split('x'))
+    return f'{width}x{round(width * height / width_)}'
+
+
+def variants(image):
+    """Готовые WebP-варианты картинки: список пар (ширина, миниатюра)."""
+    if not image:
+        return []
+    ready_variants = []
+    for width in VARIANT_WIDTHS:
+        thumbnail = backend.get_ready(
+            image, variant_geometry(width), **VARIANT_OPTIONS
+        )
+        if thumbnail is not None:
+            ready_variants.append((width, thumbnail))
+    return ready_variants
+
+
+def is_warm(image):
+    """Построены ли для картинки миниатюра и все её варианты."""
+    return (ready(image) is not None
+            and len(variants(image)) == len(VARIANT_WIDTHS))
+
+
+def build(name):
+    """Строит миниатюру и WebP-варианты картинки."""
+    get_thumbnail(name, GEOMETRY, **OPTIONS)
+    for width in VARIANT_WIDTHS:
+        get_thumbnail(name, variant_geometry(width), **VARIANT_OPTIONS)
+
+
+def generate(name):
+    """Строит миниатюру и обновляет ленты постов с этой картинкой."""
+    from .models import Post
+
+    try:
+        build(name)
+        for post in Post.objects.filter(image=name):
+            feed_cache.bump(*counters.post_feeds(post))
+    except Exception:
+        logger.exception('Не удалось построить миниатюру %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def _run(name):
+    try:
+        generate(name)
+    finally:
+        # у потока пула своё соединение с базой, не оставляем его открытым
+        connection.close()
+
+
+def _submit(name):
+    global _executor
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+        if settings.THUMBNAIL_WORKERS and _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    if settings.THUMBNAIL_WORKERS:
+        _executor.submit(_run, name)
+    else:
+        generate(name)
+
+
+def schedule(image):
+    """Ставит картинку в очередь на генерацию после коммита."""
+    if image:
+        name = image.name
+        transaction.on_commit(lambda: _submit(name))
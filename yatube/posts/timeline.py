@@ -0,0 +1,123 @@
+"""Материализованная лента подписок.
+
+При публикации пост раскладывается по лентам подписчиков автора
+(fan-out on write), поэтому страница подписок — это чтение диапазона
+индекса (user, -pub_date, -post) без JOIN через Follow.
+Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+при записи не раскладываются: читатель подтягивает их в свою ленту
+сам перед показом страницы (fan-out on read).
+"""
+from django.conf import settings
+from django.db.models import Max
+
+from . import counters, feed_cache
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+ORDERING = ('-pub_date', '-post_id')
+
+
+def enabled():
+    return settings.FOLLOW_TIMELINE
+
+
+def is_prolific(author_id):
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def _add(user_id, posts):
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+            for post_id, author_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _recent_posts(author_id, since=None):
+    posts = Post.objects.filter(author_id=author_id)
+    if since is not None:
+        posts = posts.filter(pub_date__gt=since)
+    return posts.order_by('-pub_date', '-id').values_list(
+        'id', 'author_id', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL]
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if not enabled() or is_prolific(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post.id,
+                          author_id=post.author_id, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def move(post):
+    """Переносит пост, сменивший автора, в ленты подписчиков нового."""
+    if enabled():
+        TimelineEntry.objects.filter(post=post).delete()
+        fan_out(post)
+
+
+def follow(user_id, author_id):
+    if enabled() and not is_prolific(author_id):
+        _add(user_id, _recent_posts(author_id))
+
+
+def unfollow(user_id, author_id):
+    if enabled():
+        TimelineEntry.objects.filter(
+            user_id=user_id, author_id=author_id
+        ).delete()
+
+
+def pull(user):
+    """Подтягивает в ленту свежие посты популярных авторов."""
+    prolific = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True)
+    pulled = False
+    for author_id in prolific:
+        newest = TimelineEntry.objects.filter(
+            user=user, author_id=author_id
+        ).aggregate(newest=Max('pub_date'))['newest']
+        posts = list(_recent_posts(author_id, since=newest))
+        if posts:
+            _add(user.id, posts)
+            pulled = True
+    if pulled:
+        # ключ числа записей строится из поколения, старый не нужен
+        feed_cache.bump((counters.FOLLOW, user.id))
+
+
+def entries(user):
+    """Записи ленты подписок вместе с постами для шаблона."""
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    ).order_by(*ORDERING)
+
+
+def rebuild(user_ids=None):
+    """Собирает ленты заново по текущим подпискам."""
+    follows = Follow.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    else:
+        TimelineEntry.objects.all().delete()
+    for user_id, author_id in follows.values_list('user_id', 'author_id'):
+        if not is_prolific(author_id):
+            _add(user_id, _recent_posts(author_id))
@@ -12,6 +12,10 @@ urlpatterns = [
          views.profile,
          name='profile'
          ),
+    path('search/',
+         views.search_posts,
+         name='search'
+         ),
     path('group/<slug:slug>/',
          views.group_posts,
          name='group_posts'
@@ -32,6 +36,10 @@ urlpatterns = [
          views.add_comment,
          name='add_comment'
          ),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'
+         ),
     path('follow/',
          views.follow_index,
          name='follow_index'
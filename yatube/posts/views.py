@@ -1,69 +1,204 @@
-from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import Max
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
+from . import counters, feed_cache, search, thumbnails, timeline
+from .decorators import cache_anonymous, cached_lookup
 from .forms import CommentForm, PostForm
-from .models import Group, Post, User, Follow
+from .models import AuthorStats, Comment, Group, Post, User, Follow
+from .paginators import page_position, paginate, paginate_comments
 
 
+def newest_post(posts):
+    return posts.aggregate(newest=Max('pub_date'))['newest']
+
+
+def index_feeds(request):
+    return [(counters.INDEX, None)]
+
+
+def index_modified(request):
+    return newest_post(Post.objects.all())
+
+
+def find_group(slug):
+    return cached_lookup(f'group:{slug}', Group.objects.filter(slug=slug))
+
+
+def group_feeds(request, slug):
+    group = find_group(slug)
+    return None if group is None else [(counters.GROUP, group.id)]
+
+
+def group_modified(request, slug):
+    return newest_post(Post.objects.filter(group__slug=slug))
+
+
+def find_author(username):
+    # хеш пароля и прочие поля в общий кэш не кладём
+    return cached_lookup(
+        f'user:{username}',
+        User.objects.filter(username=username).only(
+            'id', 'username', 'first_name', 'last_name'),
+    )
+
+
+def profile_feeds(request, username):
+    author = find_author(username)
+    return None if author is None else [(counters.AUTHOR, author.id)]
+
+
+def profile_modified(request, username):
+    return newest_post(Post.objects.filter(author__username=username))
+
+
+def post_feeds(request, post_id):
+    author_id = cached_lookup(
+        f'post:{post_id}',
+        Post.objects.filter(id=post_id).values_list('author_id', flat=True),
+    )
+    if author_id is None:
+        return None
+    return [(counters.POST, post_id), (counters.AUTHOR, author_id)]
+
+
+def post_modified(request, post_id):
+    dates = [
+        newest_post(Post.objects.filter(id=post_id)),
+        Comment.objects.filter(post_id=post_id).aggregate(
+            newest=Max('created'))['newest'],
+    ]
+    return max((date for date in dates if date is not None), default=None)
+
+
+@cache_anonymous(index_feeds, index_modified)
 def index(request):
-    post_list = Post.objects.all().order_by('-pub_date')
-    paginator = Paginator(post_list, settings.COUNT_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {
-        'page_obj': page_obj,
-    }
+    post_list = Post.objects.feed()
+    count_key = counters.count_key(counters.INDEX)
+    context = feed_cache.feed_context(
+        request, 'index_page', (counters.INDEX, None),
+        page=lambda: paginate(request, post_list, count_key=count_key),
+        position=page_position(request, post_list, count_key=count_key),
+    )
     return render(request, 'posts/index.html', context)
 
 
+@cache_anonymous(index_feeds, index_modified)
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    context = {'query': query, 'page_obj': None}
+    if query:
+        context['page_obj'] = paginate(
+            request, search.search(Post.objects.feed(), query),
+            count_key=search.count_key(query),
+        )
+        # ссылки пагинатора не должны терять запрос
+        context['page_query'] = urlencode({'q': query}) + '&'
+    return render(request, 'posts/search.html', context)
+
+
+@cache_anonymous(group_feeds, group_modified)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.order_by('-pub_date')
-    paginator = Paginator(posts, settings.COUNT_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {
-        'group': group,
-        'page_obj': page_obj,
-    }
+    group = find_group(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    posts = group.posts.feed()
+    count_key = counters.count_key(counters.GROUP, group.id)
+    context = feed_cache.feed_context(
+        request, 'group_page', (counters.GROUP, group.id),
+        page=lambda: paginate(request, posts, count_key=count_key),
+        position=page_position(request, posts, count_key=count_key),
+    )
+    context['group'] = group
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_anonymous(profile_feeds, profile_modified)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    post_list = user.posts.order_by('-pub_date').all()
-    paginator = Paginator(post_list, settings.COUNT_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    user = find_author(username)
+    if user is None:
+        raise Http404('Автор не найден')
+    # счётчики и подписка меняют поколение ленты автора, поэтому
+    # кэшируются вместе с ним
+    version = feed_cache.versions((counters.AUTHOR, user.id))
+    stats = feed_cache.cached(f'stats:{user.id}', version,
+                              lambda: AuthorStats.for_author(user))
+    post_list = Post.objects.feed().filter(author_id=user.id)
+    context = feed_cache.feed_context(
+        request, 'profile_page', (counters.AUTHOR, user.id),
+        page=lambda: paginate(request, post_list, count=stats.posts_count),
+        position=page_position(request, post_list,
+                               count=stats.posts_count),
+        version=version,
+    )
     if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=user,
-        ).exists()
+        following = feed_cache.cached(
+            f'following:{request.user.id}:{user.id}', version,
+            lambda: Follow.objects.filter(
+                user=request.user,
+                author_id=user.id,
+            ).exists(),
+        )
     else:
         following = None
-    context = {
+    context.update({
         'author': user,
-        'page_obj': page_obj,
+        'stats': stats,
         'following': following,
-    }
+    })
     return render(request, 'posts/profile.html', context)
 
 
+@cache_anonymous(post_feeds, post_modified, params=('cursor', 'order'))
 def post_detail(request, post_id):
-    user_post = get_object_or_404(Post, id=post_id)
+    user_post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
     form = CommentForm()
-    comments = user_post.comments.all()
+    comments = paginate_comments(
+        request, user_post.comments.select_related('author')
+    )
     context = {
         'form': form,
         'post': user_post,
+        'author_stats': AuthorStats.for_author(user_post.author),
         'comments': comments
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@cache_anonymous(post_feeds, post_modified,
+                 params=('cursor', 'order', 'format'))
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    if request.GET.get('format') == 'json':
+        comments = paginate_comments(request, post.comments.values(
+            'id', 'text', 'created', 'author__username'
+        ))
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment['id'],
+                    'text': comment['text'],
+                    'created': comment['created'],
+                    'author': comment['author__username'],
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    comments = paginate_comments(
+        request, post.comments.select_related('author')
+    )
+    return render(request, 'posts/includes/comment_list.html', {
+        'post': post,
+        'comments': comments,
+    })
+
+
 @login_required
 def post_create(request):
     groups = Group.objects.all()
@@ -72,6 +207,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post.image)
         return redirect('posts:profile', username=request.user.username)
     context = {
         'groups': groups,
@@ -90,7 +226,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post_id=post_id)
     groups = Group.objects.all()
     context = {
@@ -116,13 +254,34 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = (Post.objects.
-                 filter(author__following__user=request.user).
-                 order_by('-pub_date'))
-    paginator = Paginator(post_list, settings.COUNT_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {'page_obj': page_obj}
+    feeds = counters.follow_feeds(request.user.id)
+    version = feed_cache.versions(*feeds)
+    count_key = counters.follow_count_key(request.user.id, version)
+
+    if timeline.enabled():
+        entries = timeline.entries(request.user)
+        position = page_position(request, entries, count_key=count_key,
+                                 ordering=timeline.ORDERING)
+    else:
+        post_list = (Post.objects.feed().
+                     filter(author__following__user=request.user))
+        position = page_position(request, post_list, count_key=count_key)
+
+    def follow_page():
+        # новые посты популярных авторов нужны, только когда фрагмент
+        # рендерится заново: их публикация меняет поколение ленты
+        if timeline.enabled():
+            timeline.pull(request.user)
+            page_obj = paginate(request, entries, count_key=count_key,
+                                ordering=timeline.ORDERING)
+            page_obj.object_list = [entry.post for entry in page_obj]
+            return page_obj
+        return paginate(request, post_list, count_key=count_key)
+
+    context = feed_cache.feed_context(
+        request, 'follow_page', *feeds,
+        page=follow_page, position=position, version=version,
+    )
 
     return render(request, 'posts/follow.html', context)
 
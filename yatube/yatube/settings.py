@@ -41,10 +41,11 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,10 +53,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# панель отладки только для разработки: в бою она замедляет каждый ответ
 if DEBUG:
+    INSTALLED_APPS += [
+        'debug_toolbar',
+    ]
     MIDDLEWARE += [
         'debug_toolbar.middleware.DebugToolbarMiddleware',
     ]
@@ -65,7 +69,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, который замеряет время рендера для /metrics
+        'BACKEND': 'core.metrics.MeasuredDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -144,13 +149,115 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 COUNT_PAGES = 10
-
-CACHES = {
-    'default': {
+# сколько комментариев показывать под постом за раз
+COMMENTS_PER_PAGE = 20
+# сколько постов API отдаёт за раз самое большее (?limit=, ?ids=)
+API_MAX_PAGE_SIZE = 100
+# поиск через FTS5 показывает только столько самых новых совпадений:
+# частое слово иначе заставляет сортировать по дате весь индекс
+SEARCH_MAX_RESULTS = 1000
+# дальше этого числа строк админка не считает отфильтрованные посты
+ADMIN_COUNT_LIMIT = 10000
+
+# 'offset' — нумерованные страницы (?page=),
+# 'cursor' — keyset-пагинация лент по (pub_date, id) (?cursor=)
+FEED_PAGINATION = 'offset'
+
+# сколько секунд хранить в кэше общее число постов ленты
+FEED_COUNT_TIMEOUT = 60 * 60
+
+# сколько секунд хранить отрендеренные страницы лент (posts.feed_cache)
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# сколько секунд хранить целые страницы для анонимных посетителей
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# материализованная лента подписок (posts.timeline)
+FOLLOW_TIMELINE = False
+# авторов с большим числом подписчиков лента подтягивает при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+# сколько последних постов автора класть в ленту при подписке
+TIMELINE_BACKFILL = 200
+
+# сколько потоков строят миниатюры картинок; 0 — строить сразу в запросе
+THUMBNAIL_WORKERS = 2
+
+# загружаемые картинки уменьшаются до этого размера по большей стороне
+IMAGE_MAX_SIDE = 1920
+# картинки больше стольких пикселей отклоняются, не декодируясь
+IMAGE_MAX_PIXELS = 40_000_000
+# качество JPEG при пересохранении и желаемый предел размера файла
+IMAGE_QUALITY = 85
+IMAGE_MAX_BYTES = 1024 * 1024
+
+# Кэш: locmem (по умолчанию), file, sqlite или tiered — LRU в памяти
+# процесса перед общим для всех воркеров SQLite-кэшем.
+CACHE_BACKEND = os.getenv('YATUBE_CACHE', 'locmem')
+CACHE_DIR = os.getenv('YATUBE_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+# смена версии при деплое разом делает недействительными все старые ключи
+CACHE_KEY_PREFIX = os.getenv('YATUBE_CACHE_PREFIX', 'yatube')
+CACHE_VERSION = int(os.getenv('YATUBE_CACHE_VERSION', '1'))
+
+SHARED_CACHES = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
+for _cache in SHARED_CACHES.values():
+    _cache.update(KEY_PREFIX=CACHE_KEY_PREFIX, VERSION=CACHE_VERSION)
+
+if CACHE_BACKEND == 'tiered':
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.tiered.TwoTierCache',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'VERSION': CACHE_VERSION,
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 300,
+            },
+        },
+        'shared': SHARED_CACHES['sqlite'],
+    }
+else:
+    CACHES = {
+        'default': SHARED_CACHES[CACHE_BACKEND],
+    }
+
+# метаданные миниатюр: файл SQLite, общий для процессов, и LRU в памяти
+THUMBNAIL_KVSTORE = 'core.kvstore.SQLiteKVStore'
+THUMBNAIL_KVSTORE_PATH = os.path.join(CACHE_DIR, 'thumbnails.sqlite3')
+THUMBNAIL_KVSTORE_LRU_SIZE = 10000
+THUMBNAIL_KVSTORE_LRU_TIMEOUT = 300
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# доля запросов, которые замеряет core.middleware.MetricsMiddleware
+METRICS_SAMPLE_RATE = float(os.getenv('YATUBE_METRICS_SAMPLE_RATE', '0.1'))
+# по скольким последним замерам считать квантили на /metrics
+METRICS_BUFFER_SIZE = 1000
+# с каких адресов /metrics открывается без входа в админку; за прокси
+# REMOTE_ADDR у всех запросов один, поэтому по умолчанию список пуст
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.getenv('YATUBE_METRICS_IPS', '').split(',') if ip
+]
+
+# SQL-запросы дольше стольких миллисекунд попадают в журнал core.slowlog
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('YATUBE_SLOW_QUERY_MS', '100'))
+# сколько разных отпечатков запросов помнить в каждом процессе
+SLOW_QUERY_MAX_ENTRIES = 200
+# сколько секунд журнал процесса хранится в кэше после последней записи
+SLOW_QUERY_TIMEOUT = 60 * 60 * 24
@@ -0,0 +1,27 @@
+"""Настройки для тестов: `manage.py test` и pytest берут их сами.
+
+Пароли хешируются MD5 вместо PBKDF2, картинки лежат в памяти, а кэш
+и метаданные миниатюр пишутся во временный каталог, который удаляется
+по завершении прогона. Тесты не оставляют файлов в проекте, и
+параллельные прогоны (`manage.py test --parallel`) не делят их между
+собой.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import SHARED_CACHES
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+DEFAULT_FILE_STORAGE = 'core.storage.InMemoryStorage'
+
+CACHE_DIR = tempfile.mkdtemp(prefix='yatube-tests-')
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+MEDIA_ROOT = os.path.join(CACHE_DIR, 'media')
+SHARED_CACHES['file']['LOCATION'] = CACHE_DIR
+SHARED_CACHES['sqlite']['LOCATION'] = os.path.join(CACHE_DIR,
+                                                   'cache.sqlite3')
+THUMBNAIL_KVSTORE_PATH = os.path.join(CACHE_DIR, 'thumbnails.sqlite3')
@@ -19,6 +19,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics
+
 urlpatterns = [
     path('admin/',
          admin.site.urls
@@ -38,6 +40,14 @@ urlpatterns = [
          include('about.urls',
                  namespace='about')
          ),
+    path('api/',
+         include('posts.api_urls',
+                 namespace='api')
+         ),
+    path('metrics',
+         metrics,
+         name='metrics'
+         ),
 ]
 
 handler404 = 'core.views.page_not_found'